@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+fake_remind.py
+
+Stand-in for the remind binary, used by the benchmarks. Rather than
+evaluating a remind script, the remfile describes a synthetic calendar as
+key=value lines:
+
+    events=1000     total events
+    days=365        number of days the events are spread over
+    start=2027-01-01
+    overlap=0.25    chance that an event starts inside the previous one
+    seed=1
+
+and the same events are produced for a day however the months are split
+between calls. Only the options used by rem_agenda.py are understood:
+
+    fake_remind.py -b2 -rls<months> FILE Mon YYYY
+    fake_remind.py -ppp<months> FILE Mon YYYY
+    fake_remind.py -n FILE
+"""
+
+# Imports
+import calendar
+import datetime
+import json
+import random
+import sys
+
+# Constants
+MONTHS = [abbr for abbr in calendar.month_abbr if abbr]
+DEFAULTS = {
+    "events": "1000",
+    "days": "365",
+    "start": "2027-01-01",
+    "overlap": "0.25",
+    "seed": "1",
+}
+DURATIONS = [15, 30, 45, 60, 90, 120]
+NAMES = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi"]
+TOPICS = ["standup", "review", "planning", "lunch", "1:1", "demo", "retro"]
+
+
+# Main
+def main(argv):
+    """
+    Main Method - Writes remind style output for the synthetic calendar
+
+    Parameters
+    ----------
+    argv : array
+        Command line arguments, without the program name
+    """
+    out = sys.stdout
+    if argv[0] == "-n":
+        spec = read_spec(argv[1])
+        for line in next_occurrences(spec):
+            out.write(line + "\n")
+        return
+
+    if len(argv) == 4 and argv[0].startswith("-ppp"):
+        write = write_json
+    elif len(argv) == 5 and argv[0] == "-b2" and argv[1].startswith("-rl"):
+        argv = argv[1:]
+        write = write_rls
+    else:
+        sys.stderr.write("fake_remind: unsupported options %s\n" % argv)
+        sys.exit(1)
+
+    months = int(argv[0][4:] or 1)
+    spec = read_spec(argv[1])
+    first = datetime.date(int(argv[3]), MONTHS.index(argv[2]) + 1, 1)
+    year, month = first.year, first.month
+    dates = []
+    for _ in range(months):
+        last = calendar.monthrange(year, month)[1]
+        dates.append(
+            [datetime.date(year, month, d) for d in range(1, last + 1)]
+        )
+        year, month = (year, month + 1) if month < 12 else (year + 1, 1)
+    write(out, spec, dates)
+
+
+def write_rls(out, spec, months):
+    """
+    Write the -b2 -rls output
+
+    Parameters
+    ----------
+    out : file
+        Where to write
+    spec : dict
+        Calendar settings
+    months : array
+        Dates of each month to write
+    """
+    for dates in months:
+        for date in dates:
+            for line in day_lines(spec, date):
+                out.write(line + "\n")
+
+
+def write_json(out, spec, months):
+    """
+    Write the -ppp output, a JSON array with one object for each month and
+    one line for each entry
+
+    Parameters
+    ----------
+    out : file
+        Where to write
+    spec : dict
+        Calendar settings
+    months : array
+        Dates of each month to write
+    """
+    out.write("[\n")
+    for number, dates in enumerate(months):
+        out.write(
+            '{"monthname":"%s","year":%d,"daysinmonth":%d,"entries":[\n'
+            % (
+                calendar.month_name[dates[0].month],
+                dates[0].year,
+                len(dates),
+            )
+        )
+        separator = ""
+        for date in dates:
+            for entry in day_entries(spec, date):
+                out.write(separator + json.dumps(entry))
+                separator = ",\n"
+        out.write("\n]}%s\n" % ("," if number < len(months) - 1 else ""))
+    out.write("]\n")
+
+
+def read_spec(filename):
+    """
+    Read the synthetic calendar description
+
+    Parameters
+    ----------
+    filename : string
+        Path to the remfile
+
+    Returns
+    -------
+    dict
+        Calendar settings
+    """
+    spec = dict(DEFAULTS)
+    with open(filename) as remfile:
+        for line in remfile:
+            key, _, value = line.strip().partition("=")
+            if value and not key.startswith("#"):
+                spec[key.strip()] = value.strip()
+    spec["filename"] = filename
+    spec["events"] = int(spec["events"])
+    spec["days"] = int(spec["days"])
+    spec["overlap"] = float(spec["overlap"])
+    spec["seed"] = int(spec["seed"])
+    spec["start"] = datetime.datetime.strptime(
+        spec["start"], "%Y-%m-%d"
+    ).date()
+    return spec
+
+
+def events_on(spec, offset):
+    """
+    Number of events on the day offset days after the start
+
+    Parameters
+    ----------
+    spec : dict
+        Calendar settings
+    offset : int
+        Day number
+
+    Returns
+    -------
+    int
+        Number of events
+    """
+    if offset < 0 or offset >= spec["days"]:
+        return 0
+    total, days = spec["events"], spec["days"]
+    return total * (offset + 1) // days - total * offset // days
+
+
+def day_entries(spec, date):
+    """
+    Generate the events of one day as -ppp entries
+
+    Parameters
+    ----------
+    spec : dict
+        Calendar settings
+    date : date
+        Day to generate
+
+    Yields
+    ------
+    dict
+        Entry of remind output
+    """
+    offset = (date - spec["start"]).days
+    count = events_on(spec, offset)
+    if not count:
+        return
+
+    rng = random.Random(spec["seed"] * 1000003 + offset)
+    stamp = date.isoformat()
+    start, duration, cursor = 0, 0, 8 * 60
+    for number in range(count):
+        if number and rng.random() < spec["overlap"]:
+            start = start + rng.randrange(0, duration, 5)
+        else:
+            start = cursor + rng.randrange(0, 31, 5)
+        start %= 24 * 60
+        duration = rng.choice(DURATIONS)
+        cursor = start + duration
+        entry = {
+            "date": stamp,
+            "filename": spec["filename"],
+            "lineno": number + 1,
+            "body": "%s with %s" % (rng.choice(TOPICS), rng.choice(NAMES)),
+        }
+        if rng.random() >= 0.05:
+            entry["time"] = start
+            entry["duration"] = duration
+        yield entry
+
+
+def day_lines(spec, date):
+    """
+    Generate the -b2 -rls output for one day
+
+    Parameters
+    ----------
+    spec : dict
+        Calendar settings
+    date : date
+        Day to generate
+
+    Yields
+    ------
+    string
+        Line of remind output
+    """
+    stamp = date.strftime("%Y/%m/%d")
+    for entry in day_entries(spec, date):
+        yield "# fileinfo %d %s" % (entry["lineno"], entry["filename"])
+        if "time" in entry:
+            yield "%s * * %d %d %s" % (
+                stamp,
+                entry["duration"],
+                entry["time"],
+                entry["body"],
+            )
+        else:
+            yield "%s * * * * %s" % (stamp, entry["body"])
+
+
+def rem_lines(spec):
+    """
+    Generate a remfile of plain REM lines with the same events as the
+    synthetic calendar, one line for each event
+
+    Parameters
+    ----------
+    spec : dict
+        Calendar settings
+
+    Yields
+    ------
+    string
+        REM line
+    """
+    for offset in range(spec["days"]):
+        date = spec["start"] + datetime.timedelta(days=offset)
+        for entry in day_entries(spec, date):
+            if "time" in entry:
+                yield "REM %s AT %d:%02d DURATION %d:%02d MSG %s" % (
+                    entry["date"],
+                    entry["time"] // 60,
+                    entry["time"] % 60,
+                    entry["duration"] // 60,
+                    entry["duration"] % 60,
+                    entry["body"],
+                )
+            else:
+                yield "REM %s MSG %s" % (entry["date"], entry["body"])
+
+
+def next_occurrences(spec):
+    """
+    Generate the -n output, one line for each reminder (line number)
+
+    Parameters
+    ----------
+    spec : dict
+        Calendar settings
+
+    Yields
+    ------
+    string
+        Line of remind output
+    """
+    reminders = max(events_on(spec, offset) for offset in range(spec["days"]))
+    for number in range(reminders):
+        date = spec["start"] + datetime.timedelta(days=number % spec["days"])
+        yield "%s Reminder %d" % (date.strftime("%Y/%m/%d"), number + 1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+native_diff.py
+
+Checks that the native backend of rem_agenda.py gives the same events as
+remind. The synthetic calendars of benchmarks/fake_remind.py are written out
+as remfiles of plain REM lines and evaluated natively, then compared with the
+-rls output of fake_remind.py for the same calendars. When a real remind is
+available, random remfiles using every supported construct are also compared
+with its output, file names and line numbers included.
+
+Usage: python benchmarks/native_diff.py [--remind remind] [--months 12]
+"""
+
+# Imports
+import argparse
+import datetime
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import fake_remind  # noqa: E402
+import rem_agenda  # noqa: E402
+
+# Constants
+FAKE_REMIND = os.path.join(os.path.dirname(__file__), "fake_remind.py")
+FIXTURES = [(10, 0.25), (1000, 0.25), (20000, 0.5)]
+START = "2027-01-01"
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+MONTHS = fake_remind.MONTHS
+
+
+# Main
+def main():
+    """
+    Main Method - Runs each comparison and exits with 1 on a difference
+    """
+    arguments = parse_arguments()
+    year, month = map(int, START.split("-")[:2])
+    months = rem_agenda.month_span(year, month, arguments.months)
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size, overlap in FIXTURES:
+            spec_file, remfile = write_fixture(workdir, size, overlap)
+            expected = load(FAKE_REMIND, spec_file, "rls", months)
+            found = load(FAKE_REMIND, remfile, "native", months)
+            failures += report(
+                "fixture %d events" % size,
+                records(expected, months, False),
+                records(found, months, False),
+            )
+
+        remind = arguments.remind or shutil.which("remind")
+        if remind is None:
+            sys.stderr.write("remind not found, random remfiles skipped\n")
+        else:
+            rng = random.Random(arguments.seed)
+            for number in range(arguments.files):
+                remfile = write_random(workdir, number, rng)
+                expected = load(remind, remfile, "rls", months)
+                found = load(remind, remfile, "native", months)
+                failures += report(
+                    "random remfile %d" % number,
+                    records(expected, months, True),
+                    records(found, months, True),
+                )
+
+    sys.exit(1 if failures else 0)
+
+
+def parse_arguments():
+    """
+    Parse the arguments passed on the command line
+
+    Returns
+    -------
+    dict
+        Arguments passed on the command line
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--remind", help="Remind binary for the random remfiles"
+    )
+    parser.add_argument(
+        "--months", type=int, default=12, help="Months to compare"
+    )
+    parser.add_argument(
+        "--files", type=int, default=20, help="Random remfiles to compare"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=1, help="Seed of the random remfiles"
+    )
+    return parser.parse_args()
+
+
+def write_fixture(workdir, size, overlap):
+    """
+    Write a synthetic calendar for fake_remind.py and the matching remfile
+
+    Parameters
+    ----------
+    workdir : string
+        Directory for the files
+    size : int
+        Number of events
+    overlap : float
+        Chance that an event starts inside the previous one
+
+    Returns
+    -------
+    string
+        Path to the calendar description read by fake_remind.py
+    string
+        Path to the remfile
+    """
+    spec_file = os.path.join(workdir, "synthetic-%d.spec" % size)
+    with open(spec_file, "w") as output:
+        output.write(
+            "events=%d\ndays=365\nstart=%s\noverlap=%s\n"
+            % (size, START, overlap)
+        )
+    remfile = os.path.join(workdir, "synthetic-%d.rem" % size)
+    with open(remfile, "w") as output:
+        for line in fake_remind.rem_lines(fake_remind.read_spec(spec_file)):
+            output.write(line + "\n")
+    return spec_file, remfile
+
+
+def write_random(workdir, number, rng):
+    """
+    Write a random remfile, and a file it includes, using every construct
+    the native backend supports
+
+    Parameters
+    ----------
+    workdir : string
+        Directory for the files
+    number : int
+        Number of the remfile
+    rng : Random
+        Source of the choices
+
+    Returns
+    -------
+    string
+        Path to the remfile
+    """
+    include = os.path.join(workdir, "included-%d.rem" % number)
+    remfile = os.path.join(workdir, "random-%d.rem" % number)
+    for path in (include, remfile):
+        with open(path, "w") as output:
+            output.write("# Random reminders\n\n")
+            for line in range(rng.randint(1, 30)):
+                output.write(random_reminder(rng, line) + "\n")
+            if path == remfile:
+                output.write("INCLUDE %s\n" % include)
+                output.write(random_reminder(rng, line + 1) + "\n")
+    return remfile
+
+
+def random_reminder(rng, line):
+    """
+    Make a random REM line
+
+    Parameters
+    ----------
+    rng : Random
+        Source of the choices
+    line : int
+        Number used in the message
+
+    Returns
+    -------
+    string
+        REM line
+    """
+    kind = rng.randrange(6)
+    if kind == 0:
+        spec = " ".join(rng.sample(WEEKDAYS, rng.randint(1, 3)))
+    elif kind == 1:
+        spec = str(rng.randint(1, 28))
+    elif kind == 2:
+        spec = "%d %s" % (rng.randint(1, 28), rng.choice(MONTHS))
+    elif kind == 3:
+        date = datetime.date(2027, 1, 1) + datetime.timedelta(
+            days=rng.randrange(365)
+        )
+        spec = date.isoformat()
+    elif kind == 4:
+        spec = "%d %s 2027" % (rng.randint(1, 28), rng.choice(MONTHS))
+    else:
+        spec = rng.choice(MONTHS)
+
+    clauses = []
+    if rng.random() < 0.7:
+        clauses.append("AT %d:%02d" % (rng.randrange(24), rng.randrange(60)))
+        if rng.random() < 0.7:
+            clauses.append("DURATION %d:%02d" % (rng.randrange(4), 15))
+    if rng.random() < 0.3:
+        clauses.append("TAG %s" % rng.choice(["work", "home"]))
+    rng.shuffle(clauses)
+    return "REM %s %s MSG Reminder  %d" % (spec, " ".join(clauses), line)
+
+
+def load(remind_cmd, remfile, backend, months):
+    """
+    Load months of a remfile with a backend
+
+    Parameters
+    ----------
+    remind_cmd : string
+        Path of the remind binary
+    remfile : string
+        Path to the remfile
+    backend : string
+        rem_agenda backend
+    months : array
+        (year, month) tuples to load
+
+    Returns
+    -------
+    RemData
+        The loaded RemData
+    """
+    rem_data = rem_agenda.RemData(remind_cmd, remfile, backend=backend)
+    rem_data.load_months(months)
+    if backend == "native" and rem_data.native() is None:
+        raise RuntimeError(
+            "%s is not supported by the native backend" % remfile
+        )
+    return rem_data
+
+
+def records(rem_data, months, provenance):
+    """
+    Get the fields of every event, day by day
+
+    Parameters
+    ----------
+    rem_data : RemData
+        The loaded RemData
+    months : array
+        (year, month) tuples to read
+    provenance : bool
+        Include the file name and line number of each event
+
+    Returns
+    -------
+    dict
+        Map of (year, month, day) to a list of event fields
+    """
+    days = {}
+    for year, month in months:
+        for day in range(1, rem_agenda.days_in_month(year, month) + 1):
+            days[(year, month, day)] = [
+                (event.ordinal, event.start, event.duration, event.msg)
+                + (event.special, event.tag)
+                + ((event.filename, event.line_num) if provenance else ())
+                for event in rem_data.get_day(year, month, day) or ()
+            ]
+    return days
+
+
+def report(name, expected, found):
+    """
+    Print the result of one comparison
+
+    Parameters
+    ----------
+    name : string
+        Name of the comparison
+    expected : dict
+        Events from remind
+    found : dict
+        Events from the native backend
+
+    Returns
+    -------
+    int
+        1 if the events differ, otherwise 0
+    """
+    for date in sorted(expected):
+        if expected[date] != found.get(date):
+            sys.stderr.write(
+                "DIFF %s on %04d-%02d-%02d\n  remind: %s\n  native: %s\n"
+                % ((name,) + date + (expected[date], found.get(date)))
+            )
+            return 1
+    events = sum(len(events) for events in expected.values())
+    sys.stderr.write("ok   %s (%d events)\n" % (name, events))
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/python
+"""
+search_index.py
+
+Compares answering --search by scanning every event with the regex against
+answering it through the RemData token index, over two years of synthetic
+reminders.
+
+Usage: python benchmarks/search_index.py [EVENTS_PER_DAY]
+"""
+
+# Imports
+import argparse
+import datetime
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import rem_agenda  # noqa: E402
+
+# Constants
+DAYS = 730
+NAMES = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi"]
+TOPICS = ["standup", "review", "planning", "lunch", "1:1", "demo", "retro"]
+QUERIES = ["grace", "planning with bob", "retro"]
+
+
+# Main
+def main():
+    """
+    Main Method - Builds the synthetic reminders and times both searches
+    """
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    start = datetime.datetime(2027, 1, 1)
+
+    rem_data = rem_agenda.RemData("remind", "synthetic.rem")
+    rem_data.process_slurp(synthetic_lines(start, per_day))
+    rem_data.month_index(start.year, start.month)  # warm up
+    rem_data.index = {}
+
+    started = time.perf_counter()
+    for year, month in rem_data.loaded_months():
+        rem_data.month_index(year, month)
+    print("index build: %.3fs" % (time.perf_counter() - started))
+
+    for query in QUERIES:
+        scan, found = time_search(rem_data, start, query, False)
+        index, _ = time_search(rem_data, start, query, True)
+        print(
+            "%-21s scan %.3fs  index %.3fs  (%d days)"
+            % (repr(query), scan, index, found)
+        )
+
+
+def synthetic_lines(start, per_day):
+    """
+    Generate remind -rls style output
+
+    Parameters
+    ----------
+    start : datetime
+        First day
+    per_day : int
+        Events per day
+
+    Yields
+    ------
+    string
+        Line of remind output
+    """
+    rng = random.Random(1)
+    for offset in range(DAYS):
+        date = (start + datetime.timedelta(days=offset)).strftime("%Y/%m/%d")
+        for number in range(per_day):
+            yield "# fileinfo %d synthetic.rem" % (number + 1)
+            yield "%s * * 30 %d %s with %s" % (
+                date,
+                rng.randrange(480, 1080, 5),
+                rng.choice(TOPICS),
+                rng.choice(NAMES),
+            )
+
+
+def time_search(rem_data, start, query, use_index):
+    """
+    Time the lookup and day loop of generate_output for a search
+
+    Parameters
+    ----------
+    rem_data : RemData
+        Loaded reminders
+    start : datetime
+        First day
+    query : string
+        Search string
+    use_index : bool
+        Use the token index rather than scanning with the regex
+
+    Returns
+    -------
+    float
+        Seconds taken
+    int
+        Number of days with a match
+    """
+    arguments = argparse.Namespace(search=query, fileinfo=None)
+    started = time.perf_counter()
+    regex = re.compile(r"%s" % query, re.IGNORECASE)
+    matches = month = None
+    found = 0
+    current_date = start
+    for _ in range(DAYS):
+        if use_index and month != (current_date.year, current_date.month):
+            month = (current_date.year, current_date.month)
+            matches = rem_data.search(query, *month)
+        found += rem_agenda.get_events_for_day(
+            arguments,
+            current_date,
+            rem_data.get_day(
+                current_date.year, current_date.month, current_date.day
+            ),
+            regex,
+            matches,
+        )[rem_agenda.FOUND]
+        current_date += rem_agenda.ONE_DAY
+    return time.perf_counter() - started, found
+
+
+if __name__ == "__main__":
+    main()
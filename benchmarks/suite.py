@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+suite.py
+
+Times the main stages of rem_agenda.py against synthetic calendars served by
+benchmarks/fake_remind.py, so no remind install is needed. Results are
+written as JSON; pass an earlier results file with --compare to print how
+each stage changed.
+
+Usage: python benchmarks/suite.py [--sizes 10 1000] [--output FILE]
+                                  [--compare FILE]
+"""
+
+# Imports
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import rem_agenda  # noqa: E402
+
+# Constants
+FAKE_REMIND = os.path.join(os.path.dirname(__file__), "fake_remind.py")
+SIZES = [10, 1000, 100000, 1000000]
+START = "2027-01-01"
+DAYS = 365
+
+
+# Main
+def main():
+    """
+    Main Method - Builds the calendars, runs each stage and reports
+    """
+    arguments = parse_arguments()
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in arguments.sizes:
+            remfile = write_calendar(workdir, size, arguments.overlap)
+            for stage, seconds in run_stages(remfile, arguments.repeat):
+                result = {
+                    "events": size,
+                    "overlap": arguments.overlap,
+                    "stage": stage,
+                    "best": min(seconds),
+                    "median": statistics.median(seconds),
+                    "runs": seconds,
+                }
+                results.append(result)
+                sys.stderr.write(
+                    "%8d events  %-18s best %8.4fs  median %8.4fs\n"
+                    % (size, stage, result["best"], result["median"])
+                )
+
+    report = {"meta": metadata(arguments), "results": results}
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if arguments.compare:
+        compare(arguments.compare, results)
+
+
+def parse_arguments():
+    """
+    Parse the arguments passed on the command line
+
+    Returns
+    -------
+    dict
+        Arguments passed on the command line
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=SIZES,
+        help="Number of events in each synthetic calendar",
+    )
+    parser.add_argument(
+        "--overlap",
+        type=float,
+        default=0.25,
+        help="Chance that an event starts inside the previous one",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs of each stage"
+    )
+    parser.add_argument(
+        "--output", help="Write the JSON results here instead of stdout"
+    )
+    parser.add_argument(
+        "--compare", help="Earlier JSON results to compare against"
+    )
+    return parser.parse_args()
+
+
+def write_calendar(workdir, size, overlap):
+    """
+    Write the remfile describing a synthetic calendar for fake_remind.py
+
+    Parameters
+    ----------
+    workdir : string
+        Directory for the remfile
+    size : int
+        Number of events
+    overlap : float
+        Chance that an event starts inside the previous one
+
+    Returns
+    -------
+    string
+        Path to the remfile
+    """
+    remfile = os.path.join(workdir, "synthetic-%d.rem" % size)
+    with open(remfile, "w") as output:
+        output.write(
+            "events=%d\ndays=%d\nstart=%s\noverlap=%s\n"
+            % (size, DAYS, START, overlap)
+        )
+    return remfile
+
+
+def run_stages(remfile, repeat):
+    """
+    Time each stage against one calendar
+
+    Parameters
+    ----------
+    remfile : string
+        Path to the remfile
+    repeat : int
+        Runs of each stage
+
+    Yields
+    ------
+    string
+        Stage name
+    array
+        Seconds taken by each run
+    """
+    begin = datetime.datetime.strptime(START, "%Y-%m-%d")
+    argv = [
+        "--remind",
+        FAKE_REMIND,
+        "-r",
+        remfile,
+        "--no_cache",
+        "-b",
+        START,
+        "-d",
+        str(DAYS),
+    ]
+    arguments = rem_agenda.parse_arguments(argv)
+
+    # Remind output is captured once so the parsers are timed on their own
+    rem_data = rem_agenda.RemData(FAKE_REMIND, remfile)
+    lines = list(rem_data.run_remind("-b2", "-rls12", remfile, "Jan", "2027"))
+    json_lines = list(rem_data.run_remind("-ppp12", remfile, "Jan", "2027"))
+    days = []
+    for offset in range(DAYS):
+        date = begin + offset * rem_agenda.ONE_DAY
+        days.append((date, []))
+
+    def process_slurp():
+        loaded = rem_agenda.RemData(FAKE_REMIND, remfile)
+        loaded.process_slurp(iter(lines))
+        for date, events in days:
+            events[:] = loaded.get_day(date.year, date.month, date.day) or []
+
+    def process_json():
+        loaded = rem_agenda.RemData(FAKE_REMIND, remfile, backend="json")
+        loaded.process_json(iter(json_lines))
+
+    def event_fields():
+        for _, events in days:
+            for event in events:
+                for offset in range(len(rem_agenda.Event.FIELDS)):
+                    event[offset]
+
+    def mark_interval():
+        for _, events in days:
+            free_busy = rem_agenda.slot_list(
+                arguments.agenda_start_hour, arguments.agenda_end_hour
+            )
+            state = {}
+            for event in events:
+                if event.start is not None:
+                    rem_agenda.mark_interval(
+                        free_busy,
+                        state,
+                        event.duration_minutes,
+                        event.start_minutes,
+                        arguments.agenda_start_hour,
+                        arguments.agenda_end_hour,
+                    )
+
+    def get_events_for_day():
+        for date, events in days:
+            rem_agenda.get_events_for_day(arguments, date, events)
+
+    def generate_output():
+        loaded = rem_agenda.RemData(FAKE_REMIND, remfile)
+        with open(os.devnull, "w") as devnull:
+            with contextlib.redirect_stdout(devnull):
+                rem_agenda.generate_output(arguments, loaded)
+
+    for stage in (
+        process_slurp,
+        process_json,
+        event_fields,
+        mark_interval,
+        get_events_for_day,
+        generate_output,
+    ):
+        seconds = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            stage()
+            seconds.append(time.perf_counter() - started)
+        yield stage.__name__, seconds
+
+
+def metadata(arguments):
+    """
+    Describe the run, so results from different commits can be told apart
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+
+    Returns
+    -------
+    dict
+        Commit, interpreter and machine details
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            universal_newlines=True,
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "cpus": os.cpu_count(),
+        "days": DAYS,
+        "repeat": arguments.repeat,
+    }
+
+
+def compare(filename, results):
+    """
+    Print the change of each stage against earlier results
+
+    Parameters
+    ----------
+    filename : string
+        Earlier JSON results
+    results : array
+        Results of this run
+    """
+    with open(filename) as previous:
+        report = json.load(previous)
+    earlier = {
+        (result["events"], result["stage"]): result["best"]
+        for result in report["results"]
+    }
+    sys.stderr.write("\nCompared with %s:\n" % report["meta"].get("commit"))
+    for result in results:
+        before = earlier.get((result["events"], result["stage"]))
+        if before:
+            sys.stderr.write(
+                "%8d events  %-18s %8.4fs -> %8.4fs  x%.2f\n"
+                % (
+                    result["events"],
+                    result["stage"],
+                    before,
+                    result["best"],
+                    before / result["best"],
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -19,10 +19,31 @@ FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
 
 # Imports
 import argparse
+import bisect
+import collections.abc
+import concurrent.futures
+import contextlib
 import datetime
+import hashlib
+import heapq
+import importlib.util
+import io
+import json
+import mmap
+import os
+import pickle
 import re
+import shlex
+import shutil
+import socket
+import socketserver
+import struct
 import subprocess
+import sys
+import tempfile
 import textwrap
+import threading
+import time
 
 # Constants
 MARKER_RESOLUTION = "low"
@@ -50,12 +71,46 @@ INDENT_1 = 7
 INDENT_13 = 13
 TIME_FMT = "%H:%M"
 TWELVE_HOUR = False
+MINUTE_TABLES = {}  # (TIME_FMT, TWELVE_HOUR) -> formatted minutes of the day
+ARGUMENT_PARSERS = {}  # program name -> parser of the command line
 ONE_DAY = datetime.timedelta(days=1)
+ONE_MINUTE = datetime.timedelta(minutes=1)
 
 START_CONFLICTS = [B5, B10, B15, E5B10, E5B5, I15]
 END_CONFLICTS = [E5, E10, E15, E10B5, E5B5, I15]
 FREE = [FREE_IN_HOUR, FREE_AT_HOUR]
 
+# Marker for a 15 minute slot given the state codes of its three 5 minute
+# intervals: 0 free, 1 busy, 2 event begins, 3 event ends, 4 begins and ends
+STATE_MARKERS = {
+    (1, 1, 1): I15,
+    (1, 1, 3): E15,
+    (2, 1, 1): B15,
+    (0, 2, 1): B10,
+    (1, 3, 0): E10,
+    (0, 0, 2): B5,
+    (3, 0, 0): E5,
+    (3, 2, 1): E5B10,
+    (4, 2, 1): E5B10,
+    (1, 3, 2): E10B5,
+    (1, 3, 4): E10B5,
+    (3, 0, 2): E5B5,
+    (4, 0, 0): BE,
+    (0, 4, 0): BE,
+    (0, 0, 4): BE,
+    (0, 4, 2): E5B5,
+    (3, 4, 0): E5B5,
+    (2, 3, 0): BE,
+    (0, 2, 3): BE,
+    (2, 1, 3): "#",
+}
+
+# Heatmap symbols, from free to fully booked
+HEAT_SCALE = " .:-=+*#%@"
+
+# Characters that make a search string a regular expression
+REGEX_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+
 # Event Offset Definitions
 START_TIME = 0
 INTERVAL = 1
@@ -77,6 +132,20 @@ DEFAULT_AGENDA_START = 6
 DEFAULT_AGENDA_END = 22
 DEFAULT_DAYS = 1
 DEFAULT_VIEW = "fd"
+DEFAULT_ENGINE = "python"
+DEFAULT_FORMAT = "text"
+DEFAULT_BACKEND = "rls"
+DEFAULT_POLL_INTERVAL = 2
+DEFAULT_FREE_SLOTS = 5
+DEFAULT_JOBS = os.cpu_count() or 1
+
+# Days loaded per remind call and rows per numpy batch when streaming output
+STREAM_DAYS = 92
+BATCH_ROWS = 64
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "remdata",
+)
 
 # Main
 def main():
@@ -86,25 +155,179 @@ def main():
 
     # Parse Arguments
     arguments = parse_arguments()
+    TIMINGS.enabled = bool(arguments.timings)
+
+    # Forward the query to a running server, naming the Remfiles by their
+    # absolute paths as the server may run in another directory. The query
+    # is answered here if the server cannot answer it.
+    if arguments.client:
+        argv = sys.argv[1:]
+        if arguments.remfile:
+            argv += ["-r"] + [os.path.abspath(p) for p in arguments.remfile]
+        try:
+            status = run_client(arguments.client, argv)
+        except (OSError, RuntimeError) as socket_exception:
+            if not arguments.remfile:
+                sys.exit(
+                    "Unable to query server at %s: %s"
+                    % (arguments.client, socket_exception)
+                )
+        else:
+            if status is not None:
+                sys.exit(status)
+
+    # Create the cache for parsed remind output
+    cache = None
+    if not arguments.no_cache:
+        cache = RemCache(arguments.cache_dir)
 
     # Create Reminder Data Object
-    rem_data = RemData(arguments.remind, arguments.remfile)
+    rem_data = open_rem_data(arguments, cache)
+
+    # Compile the range into an event store instead of displaying it
+    if arguments.compile_store:
+        try:
+            rem_data.load_range(arguments.begin, int(arguments.days))
+        except RuntimeError as remind_exception:
+            sys.exit(str(remind_exception))
+        EventStore.write(arguments.compile_store, rem_data)
+        return
+
+    # Redraw the output whenever the reminders change
+    if arguments.watch:
+        watch_output(arguments, rem_data)
+        return
+
+    # Answer queries over a socket until interrupted
+    if arguments.serve:
+        RemServer(arguments.serve, rem_data, arguments.poll_interval).run()
+        return
 
     # Generate Output
-    generate_output(arguments, rem_data)
+    status = 0
+    try:
+        with TIMINGS.phase("output"):
+            if arguments.batch:
+                status = run_batch(arguments, rem_data)
+            else:
+                generate_output(arguments, rem_data)
+            sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head), which is not an error
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except RuntimeError as remind_exception:
+        sys.stdout.flush()
+        sys.exit(str(remind_exception))
+
+    # Report cache usage
+    if cache is not None and arguments.cache_stats:
+        print(cache.stats(), file=sys.stderr)
+    if arguments.cache_stats and (arguments.max_months or arguments.max_bytes):
+        print(rem_data.stats(), file=sys.stderr)
+
+    # Report where the time went, which each query of a batch does itself
+    if arguments.timings and not arguments.batch:
+        print(TIMINGS.summary(arguments.timings), file=sys.stderr)
 
+    if status:
+        sys.exit(status)
 
-def parse_arguments():
+
+def open_rem_data(arguments, cache):
     """
-    Parses the arguments passed in from the command line.
+    Creates the reminder data for the Remfiles passed on the command line
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+    cache : RemCache
+        Cache of parsed remind output, or None to always run remind
 
     Returns
     -------
-    dict
-        A map of the processed arguments
+    RemData
+        RemData for a single Remfile, otherwise MultiRemData
     """
+    remind_filenames = expand_remfiles(arguments.remfile)
+    index = is_plain_search(arguments.search) or bool(arguments.serve)
+    single = len(remind_filenames) == 1 and not arguments.per_calendar
 
-    # Get Arguments
+    if arguments.compile_store and not single:
+        sys.exit("--compile_store can only be used with a single Remfile")
+
+    store = None
+    if arguments.store:
+        if not single:
+            sys.exit("--store can only be used with a single Remfile")
+        try:
+            store = EventStore(arguments.store)
+        except (OSError, RuntimeError) as store_exception:
+            sys.exit("Unable to open event store: %s" % store_exception)
+
+    if single:
+        return RemData(
+            arguments.remind,
+            remind_filenames[0],
+            cache,
+            index,
+            arguments.jobs,
+            store,
+            arguments.backend,
+            arguments.max_months,
+            arguments.max_bytes,
+        )
+    return MultiRemData(
+        arguments.remind,
+        remind_filenames,
+        cache,
+        index,
+        arguments.jobs,
+        arguments.backend,
+        arguments.max_months,
+        arguments.max_bytes,
+    )
+
+
+def expand_remfiles(paths):
+    """
+    Lists the Remfiles named on the command line, replacing each directory
+    with the files it contains
+
+    Parameters
+    ----------
+    paths : array
+        Remfiles and directories
+
+    Returns
+    -------
+    array
+        Remfiles
+    """
+    remind_filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            remind_filenames.extend(
+                os.path.join(path, filename)
+                for filename in sorted(os.listdir(path))
+                if not filename.startswith(".")
+                and os.path.isfile(os.path.join(path, filename))
+            )
+        else:
+            remind_filenames.append(path)
+    return remind_filenames
+
+
+def argument_parser():
+    """
+    Builds the parser of the command line, which parse_arguments reuses for
+    every query of a batch or a server
+
+    Returns
+    -------
+    ArgumentParser
+        Parser of every option
+    """
     parser = argparse.ArgumentParser(
         formatter_class=argparse.RawTextHelpFormatter,
         epilog=textwrap.dedent(
@@ -148,16 +371,15 @@ def parse_arguments():
     parser.add_argument(
         "-r",
         "--remfile",
-        required=True,
-        help="Name of the Remfile to parse (required)",
+        nargs="+",
+        help="Name of the Remfile to parse, or several Remfiles or "
+        "directories of Remfiles to combine (required unless using --client)",
     )
 
     parser.add_argument(
         "-b",
         "--begin",
-        default=datetime.date.today().strftime("%Y-%m-%d"),
-        help="Starting date: YYYY-MM-DD (default: %s)"
-        % datetime.date.today().strftime("%Y-%m-%d"),
+        help="Starting date: YYYY-MM-DD (default: today)",
     )
 
     parser.add_argument(
@@ -200,27 +422,231 @@ def parse_arguments():
         "-n",
         "--next_occurrences",
         default=False,
-        help="""List next occurrences (ignores other options)""",
+        help="List next occurrences, the soonest --limit of them when given,\n"
+        "and only those matching --search (ignores other options)",
     )
     parser.add_argument(
         "-m",
         "--markerinfo",
         help="Show FREE/busy marker information (ignores other options).",
     )
+    parser.add_argument(
+        "--find_free",
+        metavar="MINUTES",
+        type=int,
+        help="List the earliest free intervals of at least MINUTES within "
+        "DAYS and the agenda hours (ignores other options)",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        help="Maximum number of intervals listed by --find_free (default: "
+        "%d)\nor of occurrences listed by --next_occurrences"
+        % DEFAULT_FREE_SLOTS,
+    )
+    parser.add_argument(
+        "--per_calendar",
+        action="store_true",
+        help="Add a free/busy row for each Remfile under the combined row",
+    )
+    parser.add_argument(
+        "--now",
+        action="store_true",
+        help="List the timed events in progress and the next ones to start "
+        "within DAYS\n(ignores other options)",
+    )
+    parser.add_argument(
+        "--conflicts",
+        action="store_true",
+        help="List overlapping events within DAYS (ignores other options)",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print busy time, booking of the agenda hours per week and a "
+        "heatmap of\nbooking by weekday and hour within DAYS (ignores other "
+        "options)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["text", "json", "ndjson"],
+        default=DEFAULT_FORMAT,
+        help="Write the agenda or search results as text, as a JSON array "
+        "of days or\nas one JSON day per line, each with its events and "
+        "busy intervals\n(default: %s)" % DEFAULT_FORMAT,
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["python", "numpy"],
+        default=DEFAULT_ENGINE,
+        help="Free/busy engine: per event [python] or batched over the "
+        "whole range with [numpy] (default: %s)" % DEFAULT_ENGINE,
+    )
+    parser.add_argument(
+        "--cache_dir",
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for cached remind output (default: %s)"
+        % DEFAULT_CACHE_DIR,
+    )
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Always run remind instead of using cached output",
+    )
+    parser.add_argument(
+        "--cache_stats",
+        action="store_true",
+        help="Print cache hit/miss counts to stderr",
+    )
+
+    parser.add_argument(
+        "--timings",
+        nargs="?",
+        const="text",
+        choices=["text", "json"],
+        help="Print the time spent in each phase and counts of remind calls,\n"
+        "parsed lines, events and cache use to stderr, as text or json",
+    )
+
+    parser.add_argument(
+        "--serve",
+        metavar="SOCKET",
+        help="Keep the reminders loaded and answer queries on a Unix socket",
+    )
+    parser.add_argument(
+        "--client",
+        metavar="SOCKET",
+        help="Send the query to the server listening on a Unix socket",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="QUERIES",
+        help="Answer the queries in the file QUERIES, or stdin for -, one "
+        "command line\nof options for each line, loading the months they "
+        "read only once",
+    )
+    parser.add_argument(
+        "--store",
+        help="Read events from a binary event store made with "
+        "--compile_store,\nrunning remind only for months it does not cover "
+        "or after the Remfile\nchanged",
+    )
+    parser.add_argument(
+        "--compile_store",
+        metavar="STORE",
+        help="Compile the reminders of the months covering --begin and "
+        "--days into\na binary event store and exit",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["rls", "json", "native"],
+        default=DEFAULT_BACKEND,
+        help="Read reminders from the -rls text output of remind, or from "
+        "its -ppp\nJSON output, which needs a recent remind. native "
+        "evaluates plain REM\nlines in process and only runs remind for "
+        "Remfiles using anything else\n(default: %s)" % DEFAULT_BACKEND,
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help="Maximum number of remind processes run at the same time when "
+        "loading\nseveral months (default: number of CPUs, %d)" % DEFAULT_JOBS,
+    )
+    parser.add_argument(
+        "--max_months",
+        type=int,
+        help="Keep at most MAX_MONTHS months of reminders in memory for each "
+        "Remfile,\nevicting the least recently used (default: no limit)",
+    )
+    parser.add_argument(
+        "--max_bytes",
+        type=int,
+        help="Keep about MAX_BYTES of reminders in memory for each Remfile, "
+        "evicting\nthe least recently used months (default: no limit)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, redrawing the output when the Remfile or the "
+        "files it\nincludes change or the date rolls over",
+    )
+    parser.add_argument(
+        "--poll_interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help="Seconds between checks of the Remfile for changes "
+        "(default: %s)" % DEFAULT_POLL_INTERVAL,
+    )
+
+    return parser
+
+
+def parse_arguments(argv=None):
+    """
+    Parses the arguments passed in from the command line.
+
+    Parameters
+    ----------
+    argv : array
+        Arguments to parse instead of the command line
+
+    Returns
+    -------
+    dict
+        A map of the processed arguments
+    """
+
+    # Get Arguments
+    prog = os.path.basename(sys.argv[0])
+    parser = ARGUMENT_PARSERS.get(prog)
+    if parser is None:
+        parser = argument_parser()
+        ARGUMENT_PARSERS[prog] = parser
+
+    arguments = parser.parse_args(argv)
 
-    arguments = parser.parse_args()
+    if not arguments.remfile and not arguments.client:
+        parser.error("the following arguments are required: -r/--remfile")
 
-    arguments.begin = datetime.datetime.strptime(arguments.begin, "%Y-%m-%d")
-    arguments.agenda_start_hour = int(arguments.agenda_start_hour)
-    arguments.agenda_end_hour = int(arguments.agenda_end_hour)
+    if arguments.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    if (
+        arguments.engine == "numpy"
+        and importlib.util.find_spec("numpy") is None
+    ):
+        parser.error("--engine numpy requires NumPy to be installed")
+
+    # Today is found for each parse, as the parser outlives the day in a
+    # server or a batch
+    if arguments.begin is None:
+        arguments.begin = datetime.date.today().strftime("%Y-%m-%d")
+    try:
+        arguments.begin = datetime.datetime.strptime(
+            arguments.begin, "%Y-%m-%d"
+        )
+    except ValueError:
+        parser.error(
+            "argument -b/--begin: invalid date: %r (expected YYYY-MM-DD)"
+            % arguments.begin
+        )
+    for option in ("days", "agenda_start_hour", "agenda_end_hour"):
+        try:
+            setattr(arguments, option, int(getattr(arguments, option)))
+        except ValueError:
+            parser.error(
+                "argument --%s: invalid int value: %r"
+                % (option, getattr(arguments, option))
+            )
 
     return arguments
 
 
-def generate_output(arguments, rem_data):
+def generate_output(arguments, rem_data, memo=None):
     """
     Prints the output of the rem_data to the screen, based on the filters
-    passed on the command line.
+    passed on the command line. Each day is written as soon as it is ready.
 
     Parameters
     ----------
@@ -228,481 +654,5021 @@ def generate_output(arguments, rem_data):
         Arguments passed on the command line
     rem_data : RemData
         Reminder Data procesesd from call to 'remind'
+    memo : dict
+        Free/busy rows and summaries already rendered for each day, reused
+        and added to by the text agenda, or None
     """
 
     # Variables
-    count = 0
-    free_busy_list = []  # Free/Busy list
-    output = []
     search_on = arguments.search != EMPTY_STRING
 
     # Print out the next_occurences if the parameter is passed
     if arguments.next_occurrences:
-        print(rem_data.get_next_occurrences())
+        out = sys.stdout
+        listed = False
+        for occurrence in rem_data.get_next_occurrences(
+            arguments.limit, arguments.search
+        ):
+            out.write(occurrence)
+            out.write("\n")
+            listed = True
+        if not listed:
+            out.write("\n")
         return
 
-    # Iterate over date range
-    current_date = arguments.begin
-    while count < int(arguments.days):
-        free_busy = slot_list(
-            arguments.agenda_start_hour, arguments.agenda_end_hour
-        )  # create a free/busy list for the day
-
-        # Split String into year/month/day integers
-        year, month, day = (
-            int(x) for x in current_date.strftime("%Y %m %d").split()
-        )
-        count += 1
-        shortdaystr = "%s" % current_date.strftime("%d %a")
-        end_date = current_date
-
-        event_data = get_events_for_day(
-            arguments,
-            current_date,
-            rem_data.get_day(year, month, day),
-            search_on,
-            free_busy,
-        )
+    # Print out the free intervals if the parameter is passed
+    if arguments.find_free:
+        print_free_intervals(arguments, rem_data)
+        return
 
-        if event_data[FOUND]:
-            output.append("%s" % event_data[DATA])
+    # Print out the busy time statistics if the parameter is passed
+    if arguments.stats:
+        print_stats(arguments, rem_data)
+        return
 
-        free_busy_list.append("%s %s" % (shortdaystr, "".join(free_busy)))
-        current_date = current_date + ONE_DAY
+    # Print out the current and next events if the parameter is passed
+    if arguments.now:
+        print_now(arguments, rem_data)
+        return
 
-    # Get Title
-    title = get_title(arguments.begin, end_date)
+    # Print out the overlapping events if the parameter is passed
+    if arguments.conflicts:
+        print_conflicts(arguments, rem_data)
+        return
 
     # Print Result
-    if not search_on:
-        print_agenda(arguments, title, free_busy_list, output)
+    if arguments.format != "text":
+        print_records(arguments, rem_data, search_on)
+    elif not search_on:
+        print_agenda(arguments, rem_data, memo)
     else:
-        print("\n".join(output))
+        print_summaries(arguments, rem_data, search_on, memo)
 
 
-def get_events_for_day(arguments, date, events, search_on, free_busy):
+def iterate_days(arguments, rem_data, count_days=True):
     """
-    Get all of the scheduled events for a given day.
+    Iterate over the date range, loading the reminders a few months ahead
+    of the day being displayed rather than the whole range up front, and
+    evicting the months behind it
 
     Parameters
     ----------
     arguments : dict
         Arguments passed on the command line
-    date : datetime
-        Date for events
-    events : array
-        Array of events for the day
-    search_on : bool
-        Indicates whether we're searching for or displaying all events
-    free_busy : array
-        List of possible agenda slots for the day
+    rem_data : RemData
+        Reminder Data procesesd from call to 'remind'
+    count_days : bool
+        Add the days and their events to the timings counters, which is
+        done for only one walk over the range of each query
 
-    Returns
-    -------
+    Yields
+    ------
+    datetime
+        Date of the day
     array
-        0 - bool indicating if data was found
-        1 - summary of day's events
+        Array of events for the day, or None
     """
+    days = int(arguments.days)
+    current_date = arguments.begin
+    loaded_until = current_date - ONE_DAY
+    for count in range(days):
+        if current_date > loaded_until:
+            # The months already walked are dropped, keeping memory flat
+            # however long the range is
+            rem_data.release_range(
+                arguments.begin, current_date.replace(day=1) - ONE_DAY
+            )
+            # The first step is kept short for the first day to show early
+            load_days = min(
+                days - count, STREAM_DAYS * (rem_data.jobs if count else 1)
+            )
+            loaded_until = current_date + (load_days - 1) * ONE_DAY
+            chunk = dict(rem_data.get_range(current_date, loaded_until))
+        events = chunk.get(current_date.toordinal())
+        if count_days and TIMINGS.active:
+            TIMINGS.count("days")
+            TIMINGS.count("events", len(events or ()))
+            TIMINGS.peak("max_events_per_day", len(events or ()))
+        yield current_date, events
+        current_date = current_date + ONE_DAY
 
-    if events is None:
-        return [False, ""]
 
-    # Generate Regex based on argument params
+def print_summaries(
+    arguments, rem_data, search_on, memo=None, count_days=True
+):
+    """
+    Print the summary of each day that has matching events, separated by
+    blank lines
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+    rem_data : RemData
+        Reminder Data procesesd from call to 'remind'
+    search_on : bool
+        Indicates whether we're searching for or displaying all events
+    memo : dict
+        Summaries already rendered for each day, or None
+    count_days : bool
+        Add the days walked to the timings counters
+    """
+    out = sys.stdout
+    separator = EMPTY_STRING
+    month = matches = regex = None
     if search_on:
         regex = re.compile(r"%s" % arguments.search, re.IGNORECASE)
-    else:
-        regex = re.compile(r".*")
-
-    found = False
-    summary = "%s:\n" % date.strftime("%a, %d %b")
-    state = {}  # for the 0-7 5min interval state codes
+    for current_date, events in iterate_days(arguments, rem_data, count_days):
+        event_data = None
+        if memo is not None:
+            event_data = memo.get((current_date, "d"))
+        if event_data is None:
+            # Events matching the search, found through the token index
+            if search_on and month != (
+                current_date.year,
+                current_date.month,
+            ):
+                month = (current_date.year, current_date.month)
+                matches = rem_data.search(arguments.search, *month)
 
-    for event in events:
-        if event[START_MINUTES] != "*" and event[DURATION_MINUTES] != "*":
-            mark_interval(
-                free_busy,
-                state,
-                event[DURATION_MINUTES],
-                event[START_MINUTES],
-                arguments.agenda_start_hour,
-                arguments.agenda_end_hour,
+            event_data = get_events_for_day(
+                arguments, current_date, events, regex, matches
             )
-        event_str = " ".join(event[:-6])
-        if not search_on or regex.search(event_str):
-            found = True
-            if arguments.fileinfo:
-                summary += "    %s [%s:%s]\n" % (
-                    event_str.lstrip(),
-                    event[FILENAME],
-                    event[LINE_NUM],
+            if memo is not None:
+                memo[(current_date, "d")] = event_data
+
+        if event_data[FOUND]:
+            out.write(separator)
+            out.write(event_data[DATA])
+            separator = "\n"
+    out.write("\n")
+
+
+def print_records(arguments, rem_data, search_on):
+    """
+    Print each day as a JSON record of its events and busy intervals, either
+    in one JSON array or one record per line (NDJSON). Records are written
+    as each day is ready, and with a search only days with a matching event
+    are written.
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+    rem_data : RemData
+        Reminder Data procesesd from call to 'remind'
+    search_on : bool
+        Indicates whether we're searching for or displaying all events
+    """
+    out = sys.stdout
+    ndjson = arguments.format == "ndjson"
+    regex = re.compile(r"%s" % arguments.search, re.IGNORECASE)
+    month = matches = None
+    written = 0
+    for current_date, events in iterate_days(arguments, rem_data):
+        events = events or []
+        busy = busy_intervals(events)
+
+        # Events matching the search, found through the token index
+        if search_on:
+            if month != (current_date.year, current_date.month):
+                month = (current_date.year, current_date.month)
+                matches = rem_data.search(arguments.search, *month)
+            events = [
+                event
+                for event in events
+                if (
+                    id(event) in matches
+                    if matches is not None
+                    else regex.search(event_text(event))
                 )
-            else:
-                summary += "    %s\n" % event_str
+            ]
+            if not events:
+                continue
 
-    return [found, summary]
+        record = json.dumps(
+            {
+                "date": current_date.strftime("%Y-%m-%d"),
+                "events": [event_record(event) for event in events],
+                "busy": busy,
+            }
+        )
+        if ndjson:
+            out.write(record + "\n")
+        else:
+            out.write(("[\n" if not written else ",\n") + record)
+        written += 1
 
+    if not ndjson:
+        out.write("\n]\n" if written else "[]\n")
 
-def get_title(start_date, end_date):
+
+def event_record(event):
     """
-    Gets the title for the agenda
+    Gets the fields of an event for JSON output
 
     Parameters
     ----------
-    start_date : datetime
-        Agenda start date
-    end_date : datetime
-        Agenda end date
+    event : Event
+        Event to describe
 
     Returns
     -------
-    string
-        Title of the agenda
+    dict
+        Start and end in minutes past midnight (None if untimed), duration
+        in minutes (None if not given), message, file, line, special, tag
+        and the calendar when several Remfiles are combined
     """
-    if start_date == end_date:
-        title = " %s " % start_date.strftime("%a, %d %b %Y")
-    else:
-        title = " %s - %s " % (
-            start_date.strftime("%a, %d %b %Y"),
-            end_date.strftime("%a, %d %b %Y"),
-        )
+    record = {
+        "start": event.start,
+        "end": (
+            None
+            if event.start is None or event.duration is None
+            else event.start + event.duration
+        ),
+        "duration": event.duration,
+        "msg": event.msg,
+        "filename": event.filename,
+        "line": event.line_num,
+        "special": event.special,
+        "tag": event.tag,
+    }
+    if event.source is not None:
+        record["calendar"] = event.source
+    return record
 
-    return title
+
+def busy_intervals(events):
+    """
+    Merge the timed events of a day into busy intervals
+
+    Parameters
+    ----------
+    events : array
+        Array of events for the day
+
+    Returns
+    -------
+    array
+        [start, end] busy intervals in minutes past midnight, in order and
+        not overlapping
+    """
+    busy = []
+    for start, end in sorted(
+        (event.start, event.start + event.duration_minutes)
+        for event in events
+        if event.start is not None and event.duration_minutes > 0
+    ):
+        if busy and start <= busy[-1][1]:
+            busy[-1][1] = max(busy[-1][1], end)
+        else:
+            busy.append([start, end])
+    return busy
 
 
-def print_agenda(arguments, title, free_busy_list, output):
+def print_free_busy(arguments, rem_data, memo=None, count_days=True):
     """
-    Print agenda to std_out
+    Print the hour bar and a free/busy row for each day, plus a row for each
+    calendar with --per_calendar
 
     Parameters
     ----------
     arguments : dict
         Arguments passed on the command line
-    title : string
-        Title of agenda
-    free_busy_list : array
-        Free/Busy time slots
-    output : string
-        Data to output
+    rem_data : RemData
+        Reminder Data procesesd from call to 'remind'
+    memo : dict
+        Rows already rendered for each day, or None. Rows missing from it
+        are marked one at a time rather than by the numpy engine.
+    count_days : bool
+        Add the days walked to the timings counters
     """
-
-    agenda_width = (
-        len(slot_list(arguments.agenda_start_hour, arguments.agenda_end_hour))
-        + 9
+    out = sys.stdout
+    out.write(
+        "%s\n"
+        % hour_bar(arguments.agenda_start_hour, arguments.agenda_end_hour)
     )
-    lbar = int((agenda_width - len(title)) / 2)
-    bars = "=" * lbar
-    needs_title = True
-    toshow = {}
-    if "f" in arguments.view:
-        toshow["f"] = "%s\n%s\n" % (
-            hour_bar(arguments.agenda_start_hour, arguments.agenda_end_hour),
-            "\n".join(free_busy_list),
-        )
 
-    if "d" in arguments.view:
-        toshow["d"] = "\n".join(output)
+    # Extra free/busy row for each calendar
+    calendars = []
+    if arguments.per_calendar and isinstance(rem_data, MultiRemData):
+        calendars = rem_data.calendars
 
-    for view_part in arguments.view:
-        if view_part in ("f", "d") and needs_title:
-            print("%s%s%s" % (bars, title, bars))
-            needs_title = False
-        print(toshow[view_part])
+    # The numpy engine marks a batch of days at once
+    batch_free_busy = arguments.engine == "numpy" and memo is None
+    labels = []
+    row_events = []
 
+    for current_date, events in iterate_days(arguments, rem_data, count_days):
+        rows = [(current_date.strftime("%d %a"), events or [])]
+        for name, calendar in calendars:
+            rows.append(
+                (
+                    "%-6.6s" % name,
+                    calendar.get_day(
+                        current_date.year, current_date.month, current_date.day
+                    )
+                    or [],
+                )
+            )
 
-class RemData:
-    """
-    Class to manage RemFile information
+        for label, day_events in rows:
+            if batch_free_busy:
+                labels.append(label)
+                row_events.append(day_events)
+            elif memo is not None and (current_date, "f", label) in memo:
+                out.write(memo[(current_date, "f", label)])
+            else:
+                free_busy = slot_list(
+                    arguments.agenda_start_hour, arguments.agenda_end_hour
+                )
+                with TIMINGS.phase("mark"):
+                    mark_events(free_busy, day_events, arguments)
+                row = "%s %s\n" % (label, "".join(free_busy))
+                if memo is not None:
+                    memo[(current_date, "f", label)] = row
+                out.write(row)
+
+        if len(labels) >= BATCH_ROWS:
+            write_free_busy_rows(out, arguments, labels, row_events)
+            labels, row_events = [], []
+
+    write_free_busy_rows(out, arguments, labels, row_events)
+    out.write("\n")
+
+
+def write_free_busy_rows(out, arguments, labels, row_events):
+    """
+    Write a batch of free/busy rows built by the numpy engine
+
+    Parameters
+    ----------
+    out : file
+        Output stream
+    arguments : dict
+        Arguments passed on the command line
+    labels : array
+        Label of each row
+    row_events : array
+        Array of the events of each row
+    """
+    if not labels:
+        return
+    with TIMINGS.phase("mark"):
+        rows = free_busy_rows(
+            row_events, arguments.agenda_start_hour, arguments.agenda_end_hour
+        )
+    for label, free_busy in zip(labels, rows):
+        out.write("%s %s\n" % (label, free_busy))
+
+
+def get_events_for_day(arguments, date, events, regex=None, matches=None):
+    """
+    Get all of the scheduled events for a given day.
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+    date : datetime
+        Date for events
+    events : array
+        Array of events for the day
+    regex : Pattern
+        Compiled search of the query, or None to display all events
+    matches : set
+        id() of the events matching the search, or None to match each event
+        against the search regex
+
+    Returns
+    -------
+    array
+        0 - bool indicating if data was found
+        1 - summary of day's events
+    """
+
+    if events is None:
+        return [False, ""]
+
+    lines = ["%s:\n" % date.strftime("%a, %d %b")]
+
+    for event in events:
+        if matches is not None and id(event) not in matches:
+            continue
+        event_str = event_text(event)
+        if regex is None or matches is not None or regex.search(event_str):
+            if arguments.fileinfo:
+                lines.append(
+                    "    %s [%s:%s]\n"
+                    % (
+                        event_str.lstrip(),
+                        event[FILENAME],
+                        event[LINE_NUM],
+                    )
+                )
+            else:
+                lines.append("    %s\n" % event_str)
+
+    return [len(lines) > 1, "".join(lines)]
+
+
+def mark_events(free_busy, events, arguments):
+    """
+    Annotate the free_busy interval with every timed event of a day
+
+    Parameters
+    ----------
+    free_busy : array
+        List of agenda times during the day
+    events : array
+        Array of events for the day
+    arguments : dict
+        Arguments passed on the command line
+    """
+    state = {}  # for the 0-7 5min interval state codes
+    for event in events:
+        if event[START_MINUTES] != "*" and event[DURATION_MINUTES] != "*":
+            mark_interval(
+                free_busy,
+                state,
+                event[DURATION_MINUTES],
+                event[START_MINUTES],
+                arguments.agenda_start_hour,
+                arguments.agenda_end_hour,
+            )
+
+
+def event_text(event):
+    """
+    Text of an event as shown in the agenda and matched by searches
+
+    Parameters
+    ----------
+    event : Event
+        Event to describe
+
+    Returns
+    -------
+    string
+        Times and message of the event, and its calendar if there are several
+    """
+    event_str = " ".join(event[:-6])
+    if event.source is not None:
+        event_str = "%s (%s)" % (event_str, event.source)
+    return event_str
+
+
+def is_plain_search(query):
+    """
+    Determines whether a search string can be answered from the token index
+
+    Parameters
+    ----------
+    query : string
+        Search string
+
+    Returns
+    -------
+    bool
+        True if the string has words and no regular expression metacharacters
+    """
+    return bool(query.split()) and not any(
+        character in REGEX_METACHARACTERS for character in query
+    )
+
+
+def print_conflicts(arguments, rem_data):
+    """
+    Print every pair of overlapping timed events in the date range, at any
+    time of day rather than only within the agenda hours
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+    rem_data : RemData
+        Reminder Data procesesd from call to 'remind'
+    """
+    last_date = arguments.begin + (int(arguments.days) - 1) * ONE_DAY
+    for ordinal, events in rem_data.get_range(arguments.begin, last_date):
+        pairs = find_conflicts(events)
+        if pairs:
+            print(
+                "%s:"
+                % datetime.date.fromordinal(ordinal).strftime("%a, %d %b %Y")
+            )
+            for first, second in pairs:
+                print(
+                    "    %s overlaps %s"
+                    % (describe_event(first), describe_event(second))
+                )
+
+
+def print_now(arguments, rem_data):
+    """
+    Print the timed events in progress and the next ones to start
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+    rem_data : RemData
+        Reminder Data procesesd from call to 'remind'
+    """
+    now = datetime.datetime.now().replace(second=0, microsecond=0)
+    for title, events in (
+        ("Now", rem_data.events_between(now, now + ONE_MINUTE)),
+        ("Next", rem_data.next_events(now, int(arguments.days))),
+    ):
+        print("%s:" % title)
+        for event in events:
+            print(
+                "    %s %s"
+                % (
+                    datetime.date.fromordinal(event.ordinal).strftime(
+                        "%a, %d %b"
+                    ),
+                    describe_event(event),
+                )
+            )
+
+
+def print_free_intervals(arguments, rem_data):
+    """
+    Print the earliest intervals within the agenda hours that are free in
+    every calendar and at least as long as requested
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+    rem_data : RemData
+        Reminder Data procesesd from call to 'remind'
+    """
+    # The day before the range is loaded for events running past midnight
+    first_date = arguments.begin - ONE_DAY
+    days = int(arguments.days)
+
+    busy = []
+    for ordinal, events in rem_data.get_range(
+        first_date, first_date + days * ONE_DAY
+    ):
+        base = ordinal * 1440
+        for event in events:
+            if event.start is not None and event.duration_minutes > 0:
+                busy.append(
+                    (
+                        base + event.start,
+                        base + event.start + event.duration_minutes,
+                    )
+                )
+    windows = [
+        (
+            ordinal * 1440 + 60 * arguments.agenda_start_hour,
+            ordinal * 1440 + 60 * arguments.agenda_end_hour,
+        )
+        for ordinal in range(
+            arguments.begin.toordinal(), arguments.begin.toordinal() + days
+        )
+    ]
+
+    # Nothing earlier than the current minute is free
+    now = datetime.datetime.now()
+    limit = arguments.limit or DEFAULT_FREE_SLOTS
+    for start, end in find_free_intervals(
+        busy,
+        windows,
+        arguments.find_free,
+        limit,
+        now.toordinal() * 1440 + now.hour * 60 + now.minute + 1,
+    ):
+        day = datetime.date.fromordinal(start // 1440)
+        print(
+            "%s %s - %s (%d min)"
+            % (
+                day.strftime("%a, %d %b %Y"),
+                format_minutes(start % 1440),
+                format_minutes(end % 1440) if end % 1440 else "24:00",
+                end - start,
+            )
+        )
+
+
+def print_stats(arguments, rem_data):
+    """
+    Print the busy time of the date range, how much of the agenda hours
+    were booked each week, and a heatmap of the booking of each hour of the
+    week averaged over the weeks
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+    rem_data : RemData
+        Reminder Data procesesd from call to 'remind'
+    """
+    # The day before the range is loaded for events running past midnight
+    first_date = arguments.begin - ONE_DAY
+    days = int(arguments.days)
+
+    range_start = arguments.begin.toordinal() * 1440
+    range_end = range_start + days * 1440
+    busy = []
+    for ordinal, events in rem_data.get_range(
+        first_date, first_date + days * ONE_DAY
+    ):
+        base = ordinal * 1440
+        for event in events:
+            if event.start is not None and event.duration_minutes > 0:
+                start = max(base + event.start, range_start)
+                end = min(
+                    base + event.start + event.duration_minutes, range_end
+                )
+                if start < end:
+                    busy.append((start - range_start, end - range_start))
+
+    with TIMINGS.phase("mark"):
+        hourly = hourly_busy(busy, days, arguments.engine)
+
+    # Hours of the week are counted from Monday 00:00 of the first week
+    offset = arguments.begin.weekday() * 24
+    weeks = (offset + days * 24 + 167) // 168
+    agenda_hours = range(
+        arguments.agenda_start_hour, arguments.agenda_end_hour
+    )
+    week_busy = [0] * weeks
+    week_booked = [0] * weeks
+    week_window = [0] * weeks
+    heat_busy = [0] * 168
+    heat_window = [0] * 168
+    for hour, minutes in enumerate(hourly):
+        week, hour_of_week = divmod(offset + hour, 168)
+        week_busy[week] += minutes
+        if hour_of_week % 24 in agenda_hours:
+            week_booked[week] += minutes
+            week_window[week] += 60
+            heat_busy[hour_of_week] += minutes
+            heat_window[hour_of_week] += 60
+
+    out = sys.stdout
+    end_date = arguments.begin + (days - 1) * ONE_DAY
+    total = sum(week_busy)
+    out.write("Busy time, %s\n" % get_title(arguments.begin, end_date).strip())
+    out.write(
+        "    %s busy, %s booked within %02d:00-%02d:00\n"
+        % (
+            format_duration(total),
+            format_share(sum(week_booked), sum(week_window)),
+            arguments.agenda_start_hour,
+            arguments.agenda_end_hour,
+        )
+    )
+
+    out.write("\n%-16s %9s %7s\n" % ("Week of", "Busy", "Booked"))
+    monday = arguments.begin - arguments.begin.weekday() * ONE_DAY
+    for week in range(weeks):
+        out.write(
+            "%s %9s %7s\n"
+            % (
+                (monday + week * 7 * ONE_DAY).strftime("%a, %d %b %Y"),
+                format_duration(week_busy[week]),
+                format_share(week_booked[week], week_window[week]),
+            )
+        )
+
+    out.write(
+        "\nBooked by hour (' ' free ... '%s' fully booked)\n" % HEAT_SCALE[-1]
+    )
+    out.write(
+        hour_bar(arguments.agenda_start_hour, arguments.agenda_end_hour - 1)
+        + "\n"
+    )
+    for weekday in range(7):
+        cells = []
+        for hour in agenda_hours:
+            booked = heat_busy[weekday * 24 + hour]
+            window = heat_window[weekday * 24 + hour]
+            level = 0
+            if booked:
+                level = min(
+                    len(HEAT_SCALE) - 1,
+                    1 + booked * (len(HEAT_SCALE) - 1) // window,
+                )
+            cells.append(HEAT_SCALE[level] * 3 + " ")
+        out.write(
+            "%-6s %s\n"
+            % (
+                datetime.date.fromordinal(weekday + 1).strftime("%a"),
+                "".join(cells).rstrip(),
+            )
+        )
+
+
+def hourly_busy(busy, days, engine):
+    """
+    Count the busy minutes of each hour of a range, with overlapping
+    intervals counted once
+
+    Parameters
+    ----------
+    busy : array
+        (start, end) busy intervals in minutes from the start of the range
+    days : int
+        Number of days in the range
+    engine : string
+        "numpy" to count with a single pass of array operations over the
+        minutes of the range, otherwise "python"
+
+    Returns
+    -------
+    array
+        Busy minutes of each hour of the range
+    """
+    if engine == "numpy":
+        # Imported here so a --client run does not pay for loading NumPy
+        import numpy
+
+        minutes = days * 1440
+        starts = numpy.fromiter((start for start, _ in busy), numpy.int64)
+        ends = numpy.fromiter((end for _, end in busy), numpy.int64)
+        running = numpy.cumsum(
+            numpy.bincount(starts, minlength=minutes + 1)
+            - numpy.bincount(ends, minlength=minutes + 1)
+        )[:minutes]
+        return (running > 0).reshape(days * 24, 60).sum(axis=1).tolist()
+
+    hourly = [0] * (days * 24)
+    busy_until = 0
+    for start, end in sorted(busy):
+        start = max(start, busy_until)
+        while start < end:
+            hour_end = min(end, (start // 60 + 1) * 60)
+            hourly[start // 60] += hour_end - start
+            start = hour_end
+        busy_until = max(busy_until, end)
+    return hourly
+
+
+def format_duration(minutes):
+    """
+    Format a number of minutes as hours and minutes
+
+    Parameters
+    ----------
+    minutes : int
+        Number of minutes
+
+    Returns
+    -------
+    string
+        Minutes as H:MM
+    """
+    return "%d:%02d" % divmod(minutes, 60)
+
+
+def format_share(part, whole):
+    """
+    Format a part of a whole as a percentage
+
+    Parameters
+    ----------
+    part : int
+        Part
+    whole : int
+        Whole, or 0 when there is nothing to compare against
+
+    Returns
+    -------
+    string
+        Percentage with one decimal, or "-" if whole is 0
+    """
+    if not whole:
+        return "-"
+    return "%.1f%%" % (100.0 * part / whole)
+
+
+def find_free_intervals(busy, windows, duration, limit, earliest):
+    """
+    Find free intervals with a single merge of the busy intervals, sorted by
+    start, against the windows in which time may be taken
+
+    Parameters
+    ----------
+    busy : array
+        (start, end) busy intervals, in minutes
+    windows : array
+        (start, end) windows in increasing order, in minutes
+    duration : int
+        Minimum length of a free interval, in minutes
+    limit : int
+        Maximum number of free intervals
+    earliest : int
+        Time before which nothing is free, in minutes
+
+    Returns
+    -------
+    array
+        (start, end) of the earliest free intervals
+    """
+    busy = sorted(busy)
+    free = []
+    position = 0
+    busy_until = earliest
+    for window_start, window_end in windows:
+        cursor = window_start
+        while cursor < window_end and len(free) < limit:
+            # Skip past everything that has started by the cursor
+            while position < len(busy) and busy[position][0] <= cursor:
+                busy_until = max(busy_until, busy[position][1])
+                position += 1
+            if busy_until > cursor:
+                cursor = busy_until
+                continue
+
+            gap_end = window_end
+            if position < len(busy):
+                gap_end = min(gap_end, busy[position][0])
+            if gap_end - cursor >= duration:
+                free.append((cursor, gap_end))
+            cursor = gap_end
+        if len(free) >= limit:
+            break
+    return free
+
+
+def find_conflicts(events):
+    """
+    Find the overlapping timed events of a day with a sweep over the events
+    ordered by start time. Events overlap when each starts before the other
+    ends, so back to back events and events without a duration never do.
+
+    Parameters
+    ----------
+    events : array
+        Array of events for the day
+
+    Returns
+    -------
+    array
+        (earlier, later) pairs of overlapping events
+    """
+    timed = sorted(
+        (event for event in events if event.start is not None),
+        key=lambda event: event.start,
+    )
+    pairs = []
+    active = []  # heap of (end, position, event) still running
+    for position, event in enumerate(timed):
+        while active and active[0][0] <= event.start:
+            heapq.heappop(active)
+        end = event.start + event.duration_minutes
+        if end <= event.start:
+            continue
+        for _, _, other in sorted(active, key=lambda item: item[1]):
+            pairs.append((other, event))
+        heapq.heappush(active, (end, position, event))
+    return pairs
+
+
+def describe_event(event):
+    """
+    Describe a timed event for the conflict report
+
+    Parameters
+    ----------
+    event : Event
+        Timed event
+
+    Returns
+    -------
+    string
+        Start and end time, message and file:line of the event
+    """
+    return "%s-%s %s [%s:%s]" % (
+        format_minutes(event.start),
+        format_minutes(event.start + event.duration_minutes),
+        event.msg,
+        event.filename,
+        event.line_num,
+    )
+
+
+def get_title(start_date, end_date):
+    """
+    Gets the title for the agenda
+
+    Parameters
+    ----------
+    start_date : datetime
+        Agenda start date
+    end_date : datetime
+        Agenda end date
+
+    Returns
+    -------
+    string
+        Title of the agenda
+    """
+    if start_date == end_date:
+        title = " %s " % start_date.strftime("%a, %d %b %Y")
+    else:
+        title = " %s - %s " % (
+            start_date.strftime("%a, %d %b %Y"),
+            end_date.strftime("%a, %d %b %Y"),
+        )
+
+    return title
+
+
+def print_agenda(arguments, rem_data, memo=None):
+    """
+    Print agenda to std_out
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+    rem_data : RemData
+        Reminder Data procesesd from call to 'remind'
+    memo : dict
+        Free/busy rows and summaries already rendered for each day, or None
+    """
+
+    end_date = arguments.begin + (int(arguments.days) - 1) * ONE_DAY
+    title = get_title(arguments.begin, end_date)
+    agenda_width = (
+        len(slot_list(arguments.agenda_start_hour, arguments.agenda_end_hour))
+        + 9
+    )
+    lbar = int((agenda_width - len(title)) / 2)
+    bars = "=" * lbar
+    needs_title = True
+
+    # The range may be walked once for each part, but is counted once
+    for view_part in arguments.view:
+        count_days = needs_title
+        if view_part in ("f", "d") and needs_title:
+            print("%s%s%s" % (bars, title, bars))
+            needs_title = False
+        if view_part == "f":
+            print_free_busy(arguments, rem_data, memo, count_days)
+        elif view_part == "d":
+            print_summaries(arguments, rem_data, False, memo, count_days)
+
+
+def watch_output(arguments, rem_data):
+    """
+    Print the output, then poll the files remind read and the date, and
+    print it again when either changes. Only the free/busy rows and
+    summaries of days whose events changed are rendered again.
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+    rem_data : RemData
+        Reminder Data procesesd from call to 'remind'
+    """
+    out = sys.stdout
+    clear = "\033[H\033[2J" if out.isatty() else EMPTY_STRING
+    today = datetime.date.today()
+    follow_today = arguments.begin.date() == today
+    memo = {}
+
+    try:
+        while True:
+            out.write(clear)
+            generate_output(arguments, rem_data, memo)
+            out.flush()
+
+            # Wait for a change, checking only modification times and sizes
+            snapshot = rem_data.snapshot()
+            while (
+                datetime.date.today() == today
+                and rem_data.snapshot() == snapshot
+            ):
+                time.sleep(arguments.poll_interval)
+
+            # Keep showing the current day when the date rolls over
+            if follow_today:
+                arguments.begin += (
+                    datetime.date.today() - today
+                ).days * ONE_DAY
+            today = datetime.date.today()
+
+            fresh = rem_data.clone()
+            try:
+                fresh.load_range(arguments.begin, int(arguments.days))
+            except RuntimeError as remind_exception:
+                # Keep showing the old data until the files change again
+                print(remind_exception, file=sys.stderr)
+                continue
+            changed = set(changed_days(arguments, rem_data, fresh))
+            for key in list(memo):
+                if key[0] in changed or key[0] < arguments.begin:
+                    del memo[key]
+            rem_data = fresh
+    except KeyboardInterrupt:
+        pass
+
+
+def changed_days(arguments, old, new):
+    """
+    Find the days of the date range whose events differ between two loads
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+    old : RemData
+        Reminders shown so far
+    new : RemData
+        Reminders just loaded
+
+    Returns
+    -------
+    array
+        Dates of the days that changed
+    """
+    changed = []
+    loaded = set(old.loaded_months())
+    last_date = arguments.begin + (int(arguments.days) - 1) * ONE_DAY
+    old_days = dict(old.get_range(arguments.begin, last_date, load=False))
+    new_days = dict(new.get_range(arguments.begin, last_date))
+    current_date = arguments.begin
+    for _ in range(int(arguments.days)):
+        ordinal = current_date.toordinal()
+        if (current_date.year, current_date.month) not in loaded or [
+            event_key(event) for event in old_days.get(ordinal, ())
+        ] != [event_key(event) for event in new_days.get(ordinal, ())]:
+            changed.append(current_date)
+        current_date = current_date + ONE_DAY
+    return changed
+
+
+def event_key(event):
+    """
+    Gets the values that determine how an event is displayed
+
+    Parameters
+    ----------
+    event : Event
+        Event to describe
+
+    Returns
+    -------
+    tuple
+        Every field of the event
+    """
+    return (
+        event.start,
+        event.duration,
+        event.msg,
+        event.filename,
+        event.line_num,
+        event.special,
+        event.tag,
+        event.source,
+    )
+
+
+class Event:
+    """
+    A single reminder occurrence.
+
+    Times are kept as minutes past midnight and only formatted when read, and
+    filenames are interned so every event from a file shares one string.
+    Indexing with the START_TIME ... TAG offsets returns the same values as
+    the list representation used previously.
+    """
+
+    __slots__ = (
+        "ordinal",
+        "start",
+        "duration",
+        "msg",
+        "filename",
+        "line_num",
+        "special",
+        "tag",
+        "source",
+    )
+
+    # Attribute returned for each of the event offset definitions
+    FIELDS = (
+        "start_time",
+        "interval",
+        "end_time",
+        "msg",
+        "filename",
+        "line_num",
+        "duration_minutes",
+        "start_minutes",
+        "special",
+        "tag",
+    )
+
+    def __init__(
+        self,
+        ordinal,
+        start,
+        duration,
+        msg,
+        filename,
+        line_num,
+        special,
+        tag,
+        source=None,
+    ):
+        """__init__.
+
+        Parameters
+        ----------
+        ordinal : int
+            Proleptic Gregorian ordinal of the day of the event
+        start : int
+            Start of the event in minutes past midnight, or None if untimed
+        duration : int
+            Duration of the event in minutes, or None if not given
+        msg : string
+            Body of the reminder
+        filename : string
+            File containing the reminder
+        line_num : int
+            Line of the reminder in the file
+        special : string
+            Special type of the reminder
+        tag : string
+            Tag of the reminder
+        source : string
+            Name of the calendar the event came from, when several are used
+        """
+        self.ordinal = ordinal
+        self.start = start
+        self.duration = duration
+        self.msg = msg
+        self.filename = sys.intern(filename)
+        self.line_num = line_num
+        self.special = special
+        self.tag = tag
+        self.source = source
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [getattr(self, field) for field in self.FIELDS[key]]
+        return getattr(self, self.FIELDS[key])
+
+    @property
+    def start_time(self):
+        """
+        string
+            Formatted start time, empty if the event is untimed
+        """
+        if self.start is None:
+            return EMPTY_STRING
+        return format_minutes(self.start)
+
+    @property
+    def end_time(self):
+        """
+        string
+            Formatted end time, empty if the event has no start or duration
+        """
+        if self.start is None or self.duration is None:
+            return EMPTY_STRING
+        return format_minutes(self.start + self.duration)
+
+    @property
+    def interval(self):
+        """
+        string
+            Separator between the start and end times
+        """
+        if self.start is not None and self.duration is not None:
+            return "-"
+        return EMPTY_STRING
+
+    @property
+    def duration_minutes(self):
+        """
+        int
+            Minutes the event takes in the free/busy display
+        """
+        if self.start is None:
+            return FIFTEEN_MINUTES
+        if self.duration is None:
+            return 0
+        return self.duration
+
+    @property
+    def start_minutes(self):
+        """
+        int
+            Start of the event in minutes past midnight, or "*" if untimed
+        """
+        if self.start is None:
+            return "*"
+        return self.start
+
+
+def format_minutes(minutes):
+    """
+    Formats a time of day
+
+    Parameters
+    ----------
+    minutes : int
+        Minutes past midnight, wrapping around at the end of the day
+
+    Returns
+    -------
+    string
+        Time formatted with TIME_FMT
+    """
+    return minute_table()[minutes % 1440]
+
+
+def minute_table():
+    """
+    Gets the formatted time of every minute of the day, built once for each
+    setting of TIME_FMT and TWELVE_HOUR
+
+    Returns
+    -------
+    array
+        Formatted time, indexed by minutes past midnight
+    """
+    table = MINUTE_TABLES.get((TIME_FMT, TWELVE_HOUR))
+    if table is None:
+        table = []
+        for minutes in range(1440):
+            time_str = datetime.time(*divmod(minutes, 60)).strftime(TIME_FMT)
+            if TWELVE_HOUR:
+                time_str = RemData.LEADING_ZERO.sub(" ", time_str)
+            table.append(time_str)
+        MINUTE_TABLES[(TIME_FMT, TWELVE_HOUR)] = table
+    return table
+
+
+class RemData:
+    """
+    Class to manage RemFile information
+    """
+
+    # Constants
+    DATE_FMT = "%a %d %b %Y"
+    LEADING_ZERO = re.compile(r"^0")
+    REGAT = re.compile(r"\s+at.*$")
+    LEADING_ZERO = re.compile(r"^0")
+
+    # Since remind only recognizes English month abbreviations but python gives
+    # the appropriate Locale version.
+    month_abbr = {
+        "01": "Jan",
+        "02": "Feb",
+        "03": "Mar",
+        "04": "Apr",
+        "05": "May",
+        "06": "Jun",
+        "07": "Jul",
+        "08": "Aug",
+        "09": "Sep",
+        "10": "Oct",
+        "11": "Nov",
+        "12": "Dec",
+    }
+
+    def __init__(
+        self,
+        remind_cmd,
+        remind_filename,
+        cache=None,
+        index=False,
+        jobs=1,
+        store=None,
+        backend=DEFAULT_BACKEND,
+        max_months=None,
+        max_bytes=None,
+    ):
+        """__init__.
+
+        Parameters
+        ----------
+        remind_cmd : string
+            Path of the Remind binary
+        remind_filename : string
+            Path of the Remind filename to read
+        cache : RemCache
+            Cache of parsed remind output, or None to always run remind
+        index : bool
+            Build the token index used by search as months are loaded,
+            rather than on the first search
+        jobs : int
+            Maximum number of remind processes run at the same time
+        store : EventStore
+            Compiled events read in place of remind output for the months
+            it covers, or None
+        backend : string
+            "rls" to read the -rls text output of remind, "json" to read
+            its -ppp JSON output, "native" to evaluate the Remfile with
+            NativeRemfile when it can be
+        max_months : int
+            Most months kept loaded, or None for no limit
+        max_bytes : int
+            Approximate most bytes of events kept loaded, or None for no
+            limit
+        """
+        self.remind_cmd = remind_cmd
+        self.remind_filename = remind_filename
+        self.cache = cache
+        self.indexing = index
+        self.jobs = jobs
+        self.store = store
+        self.backend = backend
+        self.evaluator = None
+        self.max_months = max_months
+        self.max_bytes = max_bytes
+        self.data = {}
+        self.timeline = Timeline()
+
+        # Loaded months from least to most recently used, with their size
+        # and the signatures of the files they were read from
+        self.recent = collections.OrderedDict()
+        self.evicted = collections.OrderedDict()
+        self.resident_bytes = 0
+        self.month_stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "refreshes": 0,
+        }
+        self.depends = set()
+        self.index = {}
+
+    def load_range(self, start_date, days):
+        """
+        Loads the reminders needed to display a range of days, using one span
+        of months for each run of consecutive months that are not loaded yet
+
+        Parameters
+        ----------
+        start_date : datetime
+            First day of the range
+        days : int
+            Number of days in the range
+        """
+        if days < 1:
+            return
+
+        end_date = start_date + datetime.timedelta(days=days - 1)
+        months = (end_date.year - start_date.year) * 12 + (
+            end_date.month - start_date.month
+        )
+        self.load_months(
+            month_span(start_date.year, start_date.month, months + 1)
+        )
+
+    def load_months(self, months, keep=()):
+        """
+        Loads a set of months, using one span of months for each run of
+        consecutive months that are not loaded yet
+
+        Parameters
+        ----------
+        months : iterable
+            (year, month) tuples to load
+        keep : iterable
+            Other (year, month) tuples in use, not to evict afterwards
+        """
+        months = sorted(set(months))
+        missing = self.use_months(months)
+        self.load_stored(missing)
+        self.slurp_spans(missing)
+        self.trim(months + list(keep))
+
+    def load_stored(self, months):
+        """
+        Loads the months covered by the event store, if it is up to date
+
+        Parameters
+        ----------
+        months : iterable
+            (year, month) tuples to load
+        """
+        if self.store is None or not self.store.fresh(
+            self.remind_cmd, self.remind_filename
+        ):
+            return
+        snapshot = None
+        for year, month in months:
+            if self.store.covers(year, month) and (
+                year not in self.data or month not in self.data[year]
+            ):
+                self.data.setdefault(year, {})[month] = self.store.month(
+                    year, month
+                )
+                self.depends.update(self.store.depends)
+                if snapshot is None:
+                    snapshot = self.snapshot()
+                self.remember(year, month, snapshot)
+
+    def slurp_spans(self, months):
+        """
+        Loads the months that are not loaded yet, one span of months for
+        each run of consecutive ones. Loaded months, such as those read from
+        the event store, are never parsed again, as the events parsed are
+        added to the days already loaded. With more than one job the months
+        are split into up to jobs chunks evaluated by concurrent remind
+        processes, otherwise each span is a single call to remind.
+
+        Parameters
+        ----------
+        months : iterable
+            (year, month) tuples to load, in order
+        """
+        spans = []
+        run = []
+        for year, month in months:
+            if year in self.data and month in self.data[year]:
+                continue
+            if run and (year, month) != month_span(*run[-1], 2)[1]:
+                spans.append((run[0][0], run[0][1], len(run)))
+                run = []
+            run.append((year, month))
+        if run:
+            spans.append((run[0][0], run[0][1], len(run)))
+
+        total = sum(months for _, _, months in spans)
+        if self.jobs < 2 or total < 2 or self.native() is not None:
+            for span in spans:
+                self.slurp(*span)
+            return
+
+        size = -(-total // min(self.jobs, total))
+        chunks = []
+        for start_year, start_month, months in spans:
+            month_list = month_span(start_year, start_month, months)
+            for first in range(0, months, size):
+                year, month = month_list[first]
+                chunks.append((year, month, min(size, months - first)))
+        self.slurp_concurrently(chunks)
+
+    def clone(self):
+        """
+        Creates an empty RemData for the same Remfile
+
+        Returns
+        -------
+        RemData
+            RemData with no months loaded
+        """
+        return RemData(
+            self.remind_cmd,
+            self.remind_filename,
+            self.cache,
+            self.indexing,
+            self.jobs,
+            self.store,
+            self.backend,
+            self.max_months,
+            self.max_bytes,
+        )
+
+    def remind_filenames(self):
+        """
+        Lists the Remfiles the data is read from
+
+        Returns
+        -------
+        array
+            Remfiles
+        """
+        return [self.remind_filename]
+
+    def loaded_months(self):
+        """
+        Lists the months that are loaded
+
+        Returns
+        -------
+        array
+            (year, month) tuples of the loaded months
+        """
+        return [
+            (year, month) for year in self.data for month in self.data[year]
+        ]
+
+    def snapshot(self):
+        """
+        Gets the modification time and size of the remfile and every file
+        remind read for the loaded months, to detect changes to them
+
+        Returns
+        -------
+        dict
+            Map of filename to (mtime, size)
+        """
+        return {
+            filename: RemCache.signature(filename)
+            for filename in self.depends | {self.remind_filename}
+        }
+
+    def month_index(self, year, month):
+        """
+        Gets the token index of a loaded month, building it if needed. Each
+        whitespace separated token of an event, as shown in the agenda, maps
+        to the ids (day * 65536 + position in the day) of the events that
+        contain it.
+
+        Parameters
+        ----------
+        year : int
+            year
+        month : int
+            month
+
+        Returns
+        -------
+        dict
+            Map of lower case token to list of event ids
+        """
+        index = self.index.get((year, month))
+        if index is None:
+            with TIMINGS.phase("index"):
+                index = {}
+                for day, events in self.data[year][month].items():
+                    for position, event in enumerate(events):
+                        event_id = day * 65536 + position
+                        for token in set(" ".join(event[:-6]).lower().split()):
+                            index.setdefault(token, []).append(event_id)
+                self.index[(year, month)] = index
+        return index
+
+    def candidates(self, query, year, month):
+        """
+        Gets the events of a month that may contain a plain search string,
+        using the token index. Every whitespace separated word of the string
+        has to be part of a token of the event.
+
+        Parameters
+        ----------
+        query : string
+            Search string without regular expression metacharacters
+        year : int
+            year
+        month : int
+            month
+
+        Returns
+        -------
+        array
+            Events that may contain the search string
+        """
+        if year not in self.data or month not in self.data[year]:
+            self.load_months([(year, month)])
+
+        index = self.month_index(year, month)
+        event_ids = None
+        for word in query.lower().split():
+            matches = set()
+            for token, token_ids in index.items():
+                if word in token:
+                    matches.update(token_ids)
+            event_ids = matches if event_ids is None else event_ids & matches
+            if not event_ids:
+                break
+
+        month_data = self.data[year][month]
+        events = []
+        for event_id in sorted(event_ids or ()):
+            day, position = divmod(event_id, 65536)
+            events.append(month_data[day][position])
+        return events
+
+    def search(self, query, year, month):
+        """
+        Finds the events of a month matching a search string through the
+        token index
+
+        Parameters
+        ----------
+        query : string
+            Search string
+        year : int
+            year
+        month : int
+            month
+
+        Returns
+        -------
+        set
+            id() of each matching event, or None if the search string is a
+            regular expression that has to be checked against every event
+        """
+        if not is_plain_search(query):
+            return None
+        regex = re.compile(query, re.IGNORECASE)
+        return {
+            id(event)
+            for event in self.candidates(query, year, month)
+            if regex.search(event_text(event))
+        }
+
+    def get_day(self, year, month, day):
+        """
+        Gets RemData for one day
+
+        Parameters
+        ----------
+        year : int
+            year
+        month : int
+            month
+        day : int
+            day
+
+        Returns
+        -------
+        array
+            Array of events for the day
+        """
+        if year not in self.data or month not in self.data[year]:
+            TIMINGS.count("lazy_loads")
+            self.load_months([(year, month)])
+
+        try:
+            return self.data[year][month][day]
+        except KeyError:
+            return None
+
+    def get_range(self, start_date, end_date, load=True):
+        """
+        Gets the events of each day of a range that has any, through the
+        timeline of the loaded months
+
+        Parameters
+        ----------
+        start_date : datetime
+            First day of the range
+        end_date : datetime
+            Last day of the range
+        load : bool
+            Load the months of the range that are not loaded yet, rather
+            than leave them out
+
+        Returns
+        -------
+        array
+            (day ordinal, events) tuples, in order
+        """
+        if load:
+            self.load_range(
+                start_date, end_date.toordinal() - start_date.toordinal() + 1
+            )
+        return self.sync_timeline().get_range(
+            start_date.toordinal(), end_date.toordinal()
+        )
+
+    def events_between(self, start, end):
+        """
+        Gets the timed events that overlap a span of time. The day before
+        the span is loaded as well, for events running past midnight.
+
+        Parameters
+        ----------
+        start : datetime
+            Start of the span
+        end : datetime
+            End of the span, not included
+
+        Returns
+        -------
+        array
+            Events, ordered by day and start
+        """
+        first_date = start - ONE_DAY
+        self.load_range(
+            first_date, end.toordinal() - first_date.toordinal() + 1
+        )
+        return self.sync_timeline().events_between(
+            minute_of(start), minute_of(end)
+        )
+
+    def next_events(self, moment, days):
+        """
+        Gets the timed events that start first after a moment
+
+        Parameters
+        ----------
+        moment : datetime
+            Moment to start looking from
+        days : int
+            Number of days to look ahead
+
+        Returns
+        -------
+        array
+            Events starting at the same time, or an empty array if none
+            start within days
+        """
+        self.load_range(moment, days)
+        return self.sync_timeline().next_events(minute_of(moment))
+
+    def sync_timeline(self):
+        """
+        Adds the months loaded since the last call to the timeline
+
+        Returns
+        -------
+        Timeline
+            Timeline of every loaded month
+        """
+        for year, month in self.loaded_months():
+            if (year, month) not in self.timeline.months:
+                self.timeline.add_month(year, month, self.data[year][month])
+        return self.timeline
+
+    def get_next_occurrences(self, limit=None, query=EMPTY_STRING):
+        """
+        Gets the next occurence of each event, soonest first
+
+        Parameters
+        ----------
+        limit : int
+            Only get the soonest limit occurrences, or all of them if None
+        query : string
+            Only get the occurrences whose text matches this regex
+
+        Returns
+        -------
+        iterator
+            String representation of next occurrences for each event.
+        """
+        return RemData.select_occurrences(
+            (
+                (event, EMPTY_STRING)
+                for event in self.run_remind("-n", self.remind_filename)
+            ),
+            limit,
+            query,
+        )
+
+    @staticmethod
+    def select_occurrences(occurrences, limit=None, query=EMPTY_STRING):
+        """
+        Filters and sorts lines of 'remind -n' output, keeping the soonest
+        limit of them on a heap so only those are sorted and formatted
+
+        Parameters
+        ----------
+        occurrences : iterable
+            (line of 'remind -n' output, calendar name or "") tuples
+        limit : int
+            Only keep the soonest limit occurrences, or all of them if None
+        query : string
+            Only keep the occurrences whose text matches this regex
+
+        Yields
+        ------
+        string
+            Formatted occurrence, with the calendar name when there is one
+        """
+        if query != EMPTY_STRING:
+            regex = re.compile(r"%s" % query, re.IGNORECASE)
+            occurrences = (
+                (event, name)
+                for event, name in occurrences
+                if regex.search(event.partition(" ")[2]) or regex.search(name)
+            )
+
+        if limit is None:
+            occurrences = sorted(occurrences)
+        else:
+            occurrences = heapq.nsmallest(limit, occurrences)
+
+        for event, name in occurrences:
+            if name:
+                yield "%s (%s)" % (RemData.format_occurrence(event), name)
+            else:
+                yield RemData.format_occurrence(event)
+
+    @staticmethod
+    def format_occurrence(event):
+        """
+        Formats one line of 'remind -n' output
+
+        Parameters
+        ----------
+        event : string
+            Line of 'remind -n' output
+
+        Returns
+        -------
+        string
+            The line with its date written out
+        """
+        parts = event.split()
+        year, month, day = list(map(int, parts[0].split("/")))
+        parts[0] = datetime.date(year, month, day).strftime(RemData.DATE_FMT)
+        return " ".join(parts)
+
+    def slurp(self, start_year, start_month, months):
+        """
+        Get Data from Remind output and put in Python datastructures
+
+        Parameters
+        ----------
+        start_year : int
+            Year where reminders should start
+        start_month : int
+            Month in the year where the reminders should start
+        months : int
+            Number of months to create reminders for
+        """
+        if self.load_cached(start_year, start_month, months):
+            return
+
+        if self.native() is not None:
+            with TIMINGS.phase("parse"):
+                self.process_native(start_year, start_month, months)
+            self.store_slurp(start_year, start_month, months)
+            return
+
+        # Stream remind output for the relevant date and number of months
+        with TIMINGS.phase("parse", exclude="remind"):
+            self.process_output(
+                self.run_remind(
+                    *self.slurp_options(start_year, start_month, months)
+                )
+            )
+        self.store_slurp(start_year, start_month, months)
+
+    def slurp_concurrently(self, chunks):
+        """
+        Get Data from several calls to remind run at the same time, merged
+        in the order of the chunks
+
+        Parameters
+        ----------
+        chunks : array
+            (start year, start month, number of months) tuples
+        """
+        chunks = [chunk for chunk in chunks if not self.load_cached(*chunk)]
+        if not chunks:
+            return
+
+        # Each chunk is parsed as its remind writes it, so the output is
+        # never held as a whole, and merged as soon as it and the chunks
+        # before it are done. The remind phase adds up the time each
+        # process was waited for.
+        with concurrent.futures.ThreadPoolExecutor(self.jobs) as pool:
+            for chunk, part in zip(chunks, pool.map(self.slurp_chunk, chunks)):
+                for year, months in part.data.items():
+                    self.data.setdefault(year, {}).update(months)
+                self.depends.update(part.depends)
+                self.store_slurp(*chunk)
+
+    def slurp_chunk(self, chunk):
+        """
+        Parses the remind output for a chunk of months into a RemData of its
+        own, one line at a time. Run in a thread by slurp_concurrently.
+
+        Parameters
+        ----------
+        chunk : tuple
+            (start year, start month, number of months)
+
+        Returns
+        -------
+        RemData
+            RemData holding only the months of the chunk
+        """
+        part = RemData(
+            self.remind_cmd, self.remind_filename, backend=self.backend
+        )
+        started = time.thread_time()
+        part.process_output(part.run_remind(*self.slurp_options(*chunk)))
+        if TIMINGS.active:
+            # Threads wait for remind at the same time, so only the time
+            # this thread spent working counts as parsing
+            TIMINGS.add_time("parse", time.thread_time() - started)
+        return part
+
+    def slurp_options(self, start_year, start_month, months):
+        """
+        Gets the remind arguments for a span of months
+
+        Parameters
+        ----------
+        start_year : int
+            Year where reminders should start
+        start_month : int
+            Month in the year where the reminders should start
+        months : int
+            Number of months to create reminders for
+
+        Returns
+        -------
+        array
+            Arguments passed to remind
+        """
+        if self.backend == "json":
+            options = ["-ppp%s" % months]
+        else:
+            options = ["-b2", "-rls%s" % months]
+        return options + [
+            self.remind_filename,
+            self.month_abbr["%02d" % start_month],
+            str(start_year),
+        ]
+
+    def process_output(self, lines):
+        """
+        Processes remind output with the parser for the backend
+
+        Parameters
+        ----------
+        lines : iterable
+            Output of Remind Command, one line at a time
+        """
+        if self.backend == "json":
+            self.process_json(lines)
+        else:
+            self.process_slurp(lines)
+
+    def native(self):
+        """
+        Gets the in-process evaluator of the Remfile, reading the Remfile the
+        first time
+
+        Returns
+        -------
+        NativeRemfile
+            The evaluator, or None if the backend is not native or the
+            Remfile has to be evaluated by remind
+        """
+        if self.backend != "native":
+            return None
+        if self.evaluator is None:
+            self.evaluator = NativeRemfile(self.remind_filename)
+            if not self.evaluator.supported:
+                TIMINGS.count("native_fallbacks")
+        return self.evaluator if self.evaluator.supported else None
+
+    def process_native(self, start_year, start_month, months):
+        """
+        Adds the events of a span of months evaluated by NativeRemfile, as
+        process_slurp would from the output of remind
+
+        Parameters
+        ----------
+        start_year : int
+            Year where reminders should start
+        start_month : int
+            Month in the year where the reminders should start
+        months : int
+            Number of months to create reminders for
+        """
+        evaluator = self.native()
+        last_year, last_month = month_span(start_year, start_month, months)[-1]
+        self.depends.update(evaluator.depends)
+        parsed = 0
+
+        for date, reminders in evaluator.occurrences(
+            datetime.date(start_year, start_month, 1),
+            datetime.date(
+                last_year, last_month, days_in_month(last_year, last_month)
+            ),
+        ):
+            events = (
+                self.data.setdefault(date.year, {})
+                .setdefault(date.month, {})
+                .setdefault(date.day, [])
+            )
+            ordinal = date.toordinal()
+            for reminder in reminders:
+                events.append(Event(ordinal, *reminder[NativeRemfile.EVENT :]))
+            parsed += len(reminders)
+
+        TIMINGS.count("native_events", parsed)
+
+    def load_cached(self, start_year, start_month, months):
+        """
+        Loads a span of months from the cache, if every month is cached
+
+        Parameters
+        ----------
+        start_year : int
+            Year where reminders should start
+        start_month : int
+            Month in the year where the reminders should start
+        months : int
+            Number of months to load
+
+        Returns
+        -------
+        bool
+            True if the months were loaded
+        """
+        month_list = month_span(start_year, start_month, months)
+        if self.cache is not None:
+            cached = {}
+            with TIMINGS.phase("cache"):
+                for year, month in month_list:
+                    entry = self.cache.load(
+                        self.remind_cmd,
+                        self.remind_filename,
+                        self.backend,
+                        year,
+                        month,
+                    )
+                    if entry is None:
+                        break
+                    cached[(year, month)] = entry
+            if len(cached) == len(month_list):
+                for (year, month), entry in cached.items():
+                    self.data.setdefault(year, {})[month] = entry["data"]
+                    self.depends.update(entry["depends"])
+                    if entry.get("index") is not None:
+                        self.index[(year, month)] = entry["index"]
+                snapshot = self.snapshot()
+                for year, month in month_list:
+                    self.remember(year, month, snapshot)
+                return True
+
+            # The span is read from remind, so the months after the first
+            # one missing are not looked up but still count as misses
+            unread = len(month_list) - len(cached) - 1
+            self.cache.misses += unread
+            TIMINGS.count("cache_misses", unread)
+        return False
+
+    def store_slurp(self, start_year, start_month, months):
+        """
+        Finishes loading a span of months parsed from remind output,
+        indexing and caching it
+
+        Parameters
+        ----------
+        start_year : int
+            Year where reminders start
+        start_month : int
+            Month in the year where the reminders start
+        months : int
+            Number of months loaded
+        """
+        month_list = month_span(start_year, start_month, months)
+
+        # Months without any reminders are still loaded
+        snapshot = self.snapshot()
+        for year, month in month_list:
+            self.data.setdefault(year, {}).setdefault(month, {})
+            self.index.pop((year, month), None)
+            if self.indexing:
+                self.month_index(year, month)
+            self.remember(year, month, snapshot)
+
+        if self.cache is not None:
+            depends = self.depends | {self.remind_filename}
+            with TIMINGS.phase("cache"):
+                for year, month in month_list:
+                    self.cache.store(
+                        self.remind_cmd,
+                        self.remind_filename,
+                        self.backend,
+                        year,
+                        month,
+                        self.data[year][month],
+                        depends,
+                        self.index.get((year, month)),
+                    )
+
+    def use_months(self, months):
+        """
+        Counts a request for months, making the loaded ones the most
+        recently used
+
+        Parameters
+        ----------
+        months : iterable
+            (year, month) tuples requested
+
+        Returns
+        -------
+        array
+            The requested months that are not loaded
+        """
+        missing = []
+        for key in months:
+            if key in self.recent:
+                self.recent.move_to_end(key)
+                self.month_stats["hits"] += 1
+            else:
+                missing.append(key)
+        return missing
+
+    def remember(self, year, month, snapshot):
+        """
+        Records a month that was just loaded as the most recently used
+
+        Parameters
+        ----------
+        year : int
+            year
+        month : int
+            month
+        snapshot : dict
+            Signatures of the files read, when the month was loaded
+        """
+        key = (year, month)
+        if key in self.recent:
+            self.resident_bytes -= self.recent[key][0]
+        else:
+            self.month_stats["misses"] += 1
+        size = 0
+        if self.max_bytes is not None:
+            size = month_size(self.data[year][month])
+        self.resident_bytes += size
+        self.recent[key] = (size, snapshot)
+        self.recent.move_to_end(key)
+        self.evicted.pop(key, None)
+
+    def trim(self, keep=()):
+        """
+        Evicts the least recently used months until the limits are met.
+        The months being used are kept even when they alone exceed the
+        limits.
+
+        Parameters
+        ----------
+        keep : iterable
+            (year, month) tuples not to evict
+        """
+        keep = set(keep)
+        while self.recent and (
+            (
+                self.max_months is not None
+                and len(self.recent) > self.max_months
+            )
+            or (
+                self.max_bytes is not None
+                and self.resident_bytes > self.max_bytes
+            )
+        ):
+            key = next(iter(self.recent))
+            if key in keep:
+                break
+            self.evict(*key)
+
+    def evict(self, year, month):
+        """
+        Drops a loaded month, remembering it was evicted
+
+        Parameters
+        ----------
+        year : int
+            year
+        month : int
+            month
+        """
+        size, _ = self.recent.pop((year, month))
+        self.resident_bytes -= size
+        del self.data[year][month]
+        if not self.data[year]:
+            del self.data[year]
+        self.index.pop((year, month), None)
+        self.timeline.remove_month(year, month)
+
+        self.evicted[(year, month)] = None
+        self.evicted.move_to_end((year, month))
+        if len(self.evicted) > max(self.max_months or 0, 12) * 2:
+            self.evicted.popitem(last=False)
+        self.month_stats["evictions"] += 1
+
+    def release_range(self, start_date, end_date):
+        """
+        Evicts the loaded months of a range of days, once a walk over the
+        days has gone past them
+
+        Parameters
+        ----------
+        start_date : datetime
+            First day of the range
+        end_date : datetime
+            Last day of the range
+        """
+        first = (start_date.year, start_date.month)
+        last = (end_date.year, end_date.month)
+        for key in [key for key in self.recent if first <= key <= last]:
+            self.evict(*key)
+
+    def adopt(self, data, index, depends, keep=()):
+        """
+        Takes in months loaded by another RemData for the same Remfile,
+        replacing the ones already loaded
+
+        Parameters
+        ----------
+        data : dict
+            year -> month -> day -> events of the months
+        index : dict
+            Token indexes of the months
+        depends : set
+            Files read for the months
+        keep : iterable
+            (year, month) tuples not to evict afterwards, besides the
+            months taken in
+        """
+        self.depends.update(depends)
+        snapshot = self.snapshot()
+        adopted = []
+        for year, year_data in data.items():
+            for month, month_data in year_data.items():
+                if (year, month) in self.recent:
+                    self.month_stats["refreshes"] += 1
+                self.data.setdefault(year, {})[month] = month_data
+                self.index.pop((year, month), None)
+                self.timeline.remove_month(year, month)
+                self.remember(year, month, snapshot)
+                adopted.append((year, month))
+        self.index.update(index)
+        self.trim(adopted + list(keep))
+
+    def stale_months(self):
+        """
+        Lists the loaded months read from files that changed since
+
+        Returns
+        -------
+        array
+            (year, month) tuples, least recently used first
+        """
+        signatures = {}
+        stale = []
+        for key, (_, snapshot) in self.recent.items():
+            for filename, signature in snapshot.items():
+                if filename not in signatures:
+                    signatures[filename] = RemCache.signature(filename)
+                if signatures[filename] != signature:
+                    stale.append(key)
+                    break
+        return stale
+
+    def wanted_months(self, window):
+        """
+        Lists the evicted months next to the most recently used month that
+        fit within the limits again, to read ahead of a reader scrolling
+        back to them
+
+        Parameters
+        ----------
+        window : int
+            Number of months on each side of the most recently used month
+
+        Returns
+        -------
+        array
+            (year, month) tuples
+        """
+        if not self.recent or not self.evicted:
+            return []
+        year, month = next(reversed(self.recent))
+        first_year, first_month = divmod(year * 12 + month - 1 - window, 12)
+        wanted = [
+            key
+            for key in month_span(first_year, first_month + 1, 2 * window + 1)
+            if key in self.evicted
+        ]
+        room = len(wanted)
+        if self.max_months is not None:
+            room = min(room, self.max_months - len(self.recent))
+        if self.max_bytes is not None:
+            average = self.resident_bytes // len(self.recent)
+            room = min(
+                room,
+                (self.max_bytes - self.resident_bytes) // max(average, 1),
+            )
+        return wanted[: max(room, 0)]
+
+    def refresh(self, lock=None, window=1):
+        """
+        Re-reads the loaded months whose files changed and reads back the
+        evicted months next to the most recently used one, for a background
+        thread. The months are read into a clone without the lock, then
+        taken in with the lock held.
+
+        Parameters
+        ----------
+        lock : Lock
+            Lock held by readers of this RemData, or None
+        window : int
+            Number of months on each side of the most recently used month
+            to read back
+
+        Returns
+        -------
+        int
+            Number of months read
+        """
+        lock = lock or contextlib.nullcontext()
+        with lock:
+            stale = self.stale_months()
+            wanted = self.wanted_months(window)
+        months = stale + wanted
+        if not months:
+            return 0
+
+        fresh = self.clone()
+        try:
+            fresh.load_months(months)
+        except RuntimeError:
+            # Not tried again until the files change again
+            with lock:
+                snapshot = self.snapshot()
+                for key in stale:
+                    if key in self.recent:
+                        self.recent[key] = (self.recent[key][0], snapshot)
+                for key in wanted:
+                    self.evicted.pop(key, None)
+            raise
+        with lock:
+            self.adopt(fresh.data, fresh.index, fresh.depends)
+        return len(months)
+
+    def stats(self):
+        """
+        Gets a summary of the month storage
+
+        Returns
+        -------
+        string
+            Loaded months and hit/miss/eviction/refresh counts
+        """
+        return (
+            "Months: %d loaded, %d hits, %d misses, %d evictions, "
+            "%d refreshes"
+        ) % (
+            len(self.recent),
+            self.month_stats["hits"],
+            self.month_stats["misses"],
+            self.month_stats["evictions"],
+            self.month_stats["refreshes"],
+        )
+
+    def run_remind(self, *options):
+        """
+        Runs remind and yields its output one line at a time, so the output
+        is never held in memory as a whole
+
+        Parameters
+        ----------
+        options : string
+            Arguments passed to remind
+
+        Yields
+        ------
+        string
+            Non-empty line of remind output
+
+        Raises
+        ------
+        RuntimeError
+            If remind cannot be run or exits with an error
+        """
+        # stderr goes to a file so a chatty remind cannot block on a full
+        # pipe while we are still reading stdout
+        TIMINGS.count("remind_calls")
+        with tempfile.TemporaryFile(mode="w+") as errors:
+            try:
+                process = subprocess.Popen(
+                    [self.remind_cmd] + list(options),
+                    stdout=subprocess.PIPE,
+                    stderr=errors,
+                    universal_newlines=True,
+                )
+            except OSError as remind_exception:
+                msg = "Unable to run remind command '%s'" % self.remind_cmd
+                raise RuntimeError(msg) from remind_exception
+
+            try:
+                for line in TIMINGS.iterate("remind", process.stdout):
+                    line = line.rstrip("\n")
+                    if line != EMPTY_STRING:
+                        yield line
+            finally:
+                process.stdout.close()
+                if process.poll() is None:
+                    process.kill()
+                return_code = process.wait()
+
+            if return_code != 0:
+                errors.seek(0)
+                msg = "Fatal error running remind command (exit %d): %s" % (
+                    return_code,
+                    errors.read().strip(),
+                )
+                raise RuntimeError(msg)
+
+    def process_slurp(self, lines):
+        """
+        Processes data slurped from the remind command
+
+        Parameters
+        ----------
+        lines : iterable
+            Output of Remind Command, one line at a time
+
+        Raises
+        ------
+        RuntimeError
+            If there is an issue with the Remind command or the output,
+            raises a runtime error
+        """
+        line_num = 0
+        filename = EMPTY_STRING
+        parsed = 0
+        days = {}  # date as written by remind -> (events, ordinal) of the day
+        numbers = NumberTable({"*": None})
+
+        for parsed, line in enumerate(lines, 1):
+            # The message is left in one piece
+            parts = line.split(None, 5)
+
+            # Determine if the line is describing the file
+            if line != EMPTY_STRING and parts[1] == "fileinfo":
+                line_num, filename = int(parts[2]), sys.intern(parts[3])
+                self.depends.add(filename)
+                # go to the next line for the item details
+                continue
+
+            # Each date is validated and converted once, and the list of
+            # events for data[year][month][day] is created when necessary.
+            day = days.get(parts[0])
+            if day is None:
+                self.validate_data_line(parts)
+                year, month, day_number = map(int, parts[0].split("/"))
+                day = days[parts[0]] = (
+                    self.data.setdefault(year, {})
+                    .setdefault(month, {})
+                    .setdefault(day_number, []),
+                    datetime.date(year, month, day_number).toordinal(),
+                )
+
+            # Populate local variables
+            special, tag, duration, start_minutes = parts[1:5]
+            msg = parts[5] if len(parts) == 6 else EMPTY_STRING
+            if "  " in msg or msg.endswith(" ") or not msg.isprintable():
+                # Runs of whitespace are collapsed to single spaces
+                msg = " ".join(msg.split())
+
+            day[0].append(
+                Event(
+                    day[1],
+                    numbers[start_minutes],
+                    numbers[duration],
+                    msg,
+                    filename,
+                    line_num,
+                    EMPTY_STRING if special == "*" else special,
+                    EMPTY_STRING if tag == "*" else tag,
+                )
+            )
+
+        TIMINGS.count("lines", parsed)
+
+    def process_json(self, lines):
+        """
+        Processes the JSON (-ppp) output of remind. Each month of the
+        output is decoded and added as soon as it is complete.
+
+        Parameters
+        ----------
+        lines : iterable
+            Output of Remind Command, one line at a time
+
+        Raises
+        ------
+        RuntimeError
+            If the output is not a JSON array of months
+        """
+        parsed = 0
+        days = {}  # date as written by remind -> (events, ordinal) of the day
+
+        for month_data in iterate_json_array(lines):
+            for entry in month_data.get("entries", ()):
+                parsed += 1
+                day = days.get(entry["date"])
+                if day is None:
+                    year, month, day_number = map(
+                        int, entry["date"].split("-")
+                    )
+                    day = days[entry["date"]] = (
+                        self.data.setdefault(year, {})
+                        .setdefault(month, {})
+                        .setdefault(day_number, []),
+                        datetime.date(year, month, day_number).toordinal(),
+                    )
+
+                filename = sys.intern(entry.get("filename", EMPTY_STRING))
+                self.depends.add(filename)
+                tags = entry.get("tags", EMPTY_STRING)
+                if isinstance(tags, list):
+                    tags = ",".join(tags)
+
+                day[0].append(
+                    Event(
+                        day[1],
+                        entry.get("time"),
+                        entry.get("duration"),
+                        " ".join(entry.get("body", EMPTY_STRING).split()),
+                        filename,
+                        entry.get("lineno", 0),
+                        entry.get("passthru", EMPTY_STRING),
+                        tags,
+                    )
+                )
+
+        TIMINGS.count("entries", parsed)
+
+    @staticmethod
+    def validate_data_line(parts):
+        """
+        Determines if the row is skippable or raises an exception if the data is
+        unparsable.
+
+        Parameters
+        ----------
+        parts : array
+            Array of data from the output line
+
+        Raises
+        ------
+        RuntimeError
+            If there was an issue parsing the result
+        """
+
+        if len(parts) == 0:
+            msg = "Line should not be empty"
+            raise RuntimeError(msg)
+
+        if parts[0] == REMIND:
+            msg = "Fatal error running remind command"
+            raise RuntimeError(msg)
+
+        try:
+            list(map(int, parts[0].split("/")))
+        except RuntimeError as remind_exception:
+            msg = "Error parsing remind output"
+            raise RuntimeError(msg) from remind_exception
+
+
+def iterate_json_array(lines):
+    """
+    Decodes the elements of a JSON array as each one is complete, so the
+    whole document is never decoded at once. An element is decoded once the
+    brackets read since it started are balanced. Brackets inside strings
+    are counted as well, so the count is only a hint: once it has been
+    wrong, decoding is instead retried whenever the text buffered for the
+    element has doubled.
+
+    Parameters
+    ----------
+    lines : iterable
+        The JSON text, one line at a time
+
+    Yields
+    ------
+    object
+        Each element of the array
+
+    Raises
+    ------
+    RuntimeError
+        If the text is not a JSON array
+    """
+    decoder = json.JSONDecoder()
+    separators = re.compile(r"[\s,]*")
+    pending = []
+    size = 0
+    retry_size = 0
+    depth = 0  # Brackets opened and not closed yet, the array included
+    hinting = True
+    started = False
+    finished = False
+    lines = iter(lines)
+
+    while not finished:
+        line = next(lines, None)
+        if line is None:
+            finished = True
+        else:
+            pending.append(line)
+            size += len(line) + 1
+            depth += line.count("{") + line.count("[")
+            depth -= line.count("}") + line.count("]")
+            if depth > 1 if hinting else size < retry_size:
+                continue
+
+        text = "\n".join(pending)
+        position = 0
+        if not started:
+            position = len(text) - len(text.lstrip())
+            if position == len(text):
+                continue
+            if text[position] != "[":
+                raise RuntimeError("Error parsing remind output")
+            started = True
+            position += 1
+
+        while True:
+            position = separators.match(text, position).end()
+            if position == len(text) or text[position] == "]":
+                break
+            try:
+                element, position = decoder.raw_decode(text, position)
+            except json.JSONDecodeError as json_exception:
+                if finished:
+                    msg = "Error parsing remind output"
+                    raise RuntimeError(msg) from json_exception
+                hinting = False
+                break
+            yield element
+
+        pending = [text[position:]]
+        size = len(pending[0])
+        retry_size = 2 * size
+        depth = 1 + pending[0].count("{") + pending[0].count("[")
+        depth -= pending[0].count("}") + pending[0].count("]")
+
+    if not started:
+        raise RuntimeError("Error parsing remind output")
+
+
+class NumberTable(dict):
+    """
+    Map of the numbers written by remind to their values, with "*" for no
+    value. Numbers are converted the first time they are seen.
+    """
+
+    def __missing__(self, text):
+        value = self[text] = int(text)
+        return value
+
+
+class NativeRemfile:
+    """
+    In-process evaluator of Remfiles that only hold plain reminders: REM
+    lines with a fixed date or weekdays, AT, DURATION, TAG and MSG, and
+    INCLUDE lines. A Remfile using anything else, such as OMIT, SATISFY,
+    expressions, functions or substitutions, is not supported and is left
+    to remind.
+
+    Each reminder is a tuple of the weekdays it is on (or None), its day,
+    month and year (each None when not given), then the Event fields from
+    start to tag.
+    """
+
+    # Constants
+    MONTHS = [
+        "january",
+        "february",
+        "march",
+        "april",
+        "may",
+        "june",
+        "july",
+        "august",
+        "september",
+        "october",
+        "november",
+        "december",
+    ]
+    WEEKDAYS = [
+        "monday",
+        "tuesday",
+        "wednesday",
+        "thursday",
+        "friday",
+        "saturday",
+        "sunday",
+    ]
+    ISO_DATE = re.compile(r"(\d{4})-(\d\d)-(\d\d)$")
+    TIME = re.compile(r"(\d{1,3})[:.]([0-5]\d)$")
+    WORD = re.compile(r"\S+")
+
+    # Offset of the first Event field in a reminder
+    EVENT = 4
+
+    def __init__(self, filename):
+        """__init__.
+
+        Parameters
+        ----------
+        filename : string
+            Path of the Remfile
+        """
+        self.filename = filename
+        self.reminders = []
+        self.depends = set()
+        self.supported = self.read(filename, ())
+
+    def read(self, filename, including):
+        """
+        Reads the reminders of a file and the files it includes
+
+        Parameters
+        ----------
+        filename : string
+            Path of the file, as remind would report it
+        including : tuple
+            Files whose INCLUDE lines led to this one
+
+        Returns
+        -------
+        bool
+            True if every line is supported
+        """
+        if filename in including:
+            return False
+        try:
+            with open(filename) as remfile:
+                lines = remfile.readlines()
+        except (OSError, UnicodeDecodeError):
+            return False
+
+        filename = sys.intern(filename)
+        self.depends.add(filename)
+        for line_num, line in enumerate(lines, 1):
+            words = line.split(None, 1)
+            if not words or words[0][0] in "#;":
+                continue
+            if "[" in line or line.rstrip().endswith("\\"):
+                return False
+
+            command = words[0].upper()
+            argument = words[1].strip() if len(words) == 2 else EMPTY_STRING
+            if command == "INCLUDE":
+                if (
+                    argument == EMPTY_STRING
+                    or argument.startswith('"')
+                    or os.path.isdir(argument)
+                    or not self.read(argument, including + (filename,))
+                ):
+                    return False
+            elif command == "REM":
+                reminder = self.parse_reminder(argument, filename, line_num)
+                if reminder is None:
+                    return False
+                self.reminders.append(reminder)
+            else:
+                return False
+        return True
+
+    def parse_reminder(self, text, filename, line_num):
+        """
+        Parses the part of a REM line after the REM keyword
+
+        Parameters
+        ----------
+        text : string
+            Date specification, clauses and message of the reminder
+        filename : string
+            File of the reminder
+        line_num : int
+            Line of the reminder in the file
+
+        Returns
+        -------
+        tuple
+            The reminder, or None if it is not supported
+        """
+        weekdays = set()
+        day = month = year = start = duration = None
+        tags = []
+
+        words = self.WORD.finditer(text)
+        for match in words:
+            word = match.group().lower()
+            if word == "msg":
+                body = text[match.end() :]
+                if "%" in body or not self.valid_date(
+                    weekdays, day, month, year
+                ):
+                    return None
+                return (
+                    frozenset(weekdays) or None,
+                    day,
+                    month,
+                    year,
+                    start,
+                    duration if start is not None else None,
+                    " ".join(body.split()),
+                    filename,
+                    line_num,
+                    EMPTY_STRING,
+                    ",".join(tags),
+                )
+
+            if word in ("at", "duration", "tag"):
+                value = next(words, None)
+                if value is None:
+                    return None
+                if word == "tag":
+                    tags.append(value.group())
+                    continue
+                minutes = self.parse_minutes(value.group())
+                if minutes is None:
+                    return None
+                if word == "duration":
+                    duration = minutes
+                elif start is None and minutes < 1440:
+                    start = minutes
+                else:
+                    return None
+            elif word.isdigit():
+                number = int(word)
+                if 1 <= number <= 31 and day is None:
+                    day = number
+                elif len(word) == 4 and number >= 1990 and year is None:
+                    year = number
+                else:
+                    return None
+            elif self.ISO_DATE.match(word):
+                if (day, month, year) != (None, None, None):
+                    return None
+                year, month, day = map(int, word.split("-"))
+            elif len(word) >= 3 and word.isalpha():
+                months = [m for m in self.MONTHS if m.startswith(word)]
+                days = [d for d in self.WEEKDAYS if d.startswith(word)]
+                if months and month is None:
+                    month = self.MONTHS.index(months[0]) + 1
+                elif days:
+                    weekdays.add(self.WEEKDAYS.index(days[0]))
+                else:
+                    return None
+            else:
+                return None
+
+        # Reminders without a type
+        return None
+
+    @staticmethod
+    def valid_date(weekdays, day, month, year):
+        """
+        Determines if a date specification has the meaning it would have in
+        remind. Weekdays mixed with a date, and days that are missing from
+        some of the months they would fall in, are left to remind.
+
+        Parameters
+        ----------
+        weekdays : set
+            Weekdays given, Monday being 0
+        day : int
+            Day given, or None
+        month : int
+            Month given, or None
+        year : int
+            Year given, or None
+
+        Returns
+        -------
+        bool
+            True if the specification is supported
+        """
+        if weekdays:
+            return (day, month, year) == (None, None, None)
+        if day is None or day <= 28:
+            return True
+        if month is None:
+            return False
+        if year is None:
+            return day <= days_in_month(2001, month)
+        return day <= days_in_month(year, month)
+
+    def parse_minutes(self, text):
+        """
+        Parses an AT or DURATION value written as hours and minutes
+
+        Parameters
+        ----------
+        text : string
+            Value such as 9:30 or 9.30
+
+        Returns
+        -------
+        int
+            Minutes, or None if the value is not supported
+        """
+        match = self.TIME.match(text)
+        if match is None:
+            return None
+        return int(match.group(1)) * 60 + int(match.group(2))
+
+    def occurrences(self, first, last):
+        """
+        Evaluates the reminders for a range of days
+
+        Parameters
+        ----------
+        first : date
+            First day of the range
+        last : date
+            Last day of the range
+
+        Yields
+        ------
+        date
+            Day with at least one reminder
+        array
+            Reminders of the day, in the order remind gives them
+        """
+        for ordinal in range(first.toordinal(), last.toordinal() + 1):
+            date = datetime.date.fromordinal(ordinal)
+            weekday = date.weekday()
+            reminders = [
+                reminder
+                for reminder in self.reminders
+                if (reminder[0] is None or weekday in reminder[0])
+                and reminder[1] in (None, date.day)
+                and reminder[2] in (None, date.month)
+                and reminder[3] in (None, date.year)
+            ]
+            if reminders:
+                yield date, reminders
+
+
+class MultiRemData:
+    """
+    Combines the reminders of several Remfiles, one RemData each.
+
+    The Remfiles are evaluated by remind and parsed in a pool of processes,
+    one per Remfile, and a day's events from every Remfile are merged with
+    each event tagged with the name of the calendar it came from.
+    """
+
+    def __init__(
+        self,
+        remind_cmd,
+        remind_filenames,
+        cache=None,
+        index=False,
+        jobs=1,
+        backend=DEFAULT_BACKEND,
+        max_months=None,
+        max_bytes=None,
+    ):
+        """__init__.
+
+        Parameters
+        ----------
+        remind_cmd : string
+            Path of the Remind binary
+        remind_filenames : array
+            Paths of the Remind filenames to read
+        cache : RemCache
+            Cache of parsed remind output, or None to always run remind
+        index : bool
+            Build the token index used by search as months are loaded
+        jobs : int
+            Maximum number of remind processes run at the same time, shared
+            between the Remfiles
+        backend : string
+            "rls", "json" or "native", how each Remfile is read
+        max_months : int
+            Most months kept loaded for each Remfile, or None for no limit
+        max_bytes : int
+            Approximate most bytes of events kept loaded for each Remfile,
+            or None for no limit
+        """
+        self.remind_cmd = remind_cmd
+        self.cache = cache
+        self.indexing = index
+        self.jobs = jobs
+        self.backend = backend
+        self.max_months = max_months
+        self.max_bytes = max_bytes
+        calendar_jobs = max(1, jobs // len(remind_filenames))
+        self.calendars = [
+            (
+                name,
+                RemData(
+                    remind_cmd,
+                    remind_filename,
+                    cache,
+                    index,
+                    calendar_jobs,
+                    backend=backend,
+                    max_months=max_months,
+                    max_bytes=max_bytes,
+                ),
+            )
+            for name, remind_filename in zip(
+                calendar_names(remind_filenames), remind_filenames
+            )
+        ]
+
+    def clone(self):
+        """
+        Creates an empty MultiRemData for the same Remfiles
+
+        Returns
+        -------
+        MultiRemData
+            MultiRemData with no months loaded
+        """
+        return MultiRemData(
+            self.remind_cmd,
+            self.remind_filenames(),
+            self.cache,
+            self.indexing,
+            self.jobs,
+            self.backend,
+            self.max_months,
+            self.max_bytes,
+        )
+
+    def remind_filenames(self):
+        """
+        Lists the Remfiles the data is read from
+
+        Returns
+        -------
+        array
+            Remfiles
+        """
+        return [calendar.remind_filename for _, calendar in self.calendars]
+
+    def load_range(self, start_date, days):
+        """
+        Loads the reminders needed to display a range of days
+
+        Parameters
+        ----------
+        start_date : datetime
+            First day of the range
+        days : int
+            Number of days in the range
+        """
+        if days < 1:
+            return
+
+        end_date = start_date + datetime.timedelta(days=days - 1)
+        months = (end_date.year - start_date.year) * 12 + (
+            end_date.month - start_date.month
+        )
+        self.load_months(
+            month_span(start_date.year, start_date.month, months + 1)
+        )
+
+    def load_months(self, months):
+        """
+        Loads a set of months for every Remfile, in parallel
+
+        Parameters
+        ----------
+        months : iterable
+            (year, month) tuples to load
+        """
+        months = sorted(set(months))
+        jobs = []
+        for _, calendar in self.calendars:
+            missing = calendar.use_months(months)
+            if missing:
+                jobs.append((calendar, missing))
+
+        if not jobs:
+            return
+        if len(jobs) == 1:
+            calendar, missing = jobs[0]
+            calendar.load_months(missing, months)
+            return
+
+        workers = min(len(jobs), os.cpu_count() or 1)
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            results = pool.map(
+                load_calendar,
+                [calendar.clone() for calendar, _ in jobs],
+                [missing for _, missing in jobs],
+                [TIMINGS.active] * len(jobs),
+            )
+            for (calendar, _), result in zip(jobs, results):
+                data, index, depends, hits, misses, timings = result
+                TIMINGS.merge(timings)
+                calendar.adopt(data, index, depends, months)
+                if self.cache is not None:
+                    self.cache.hits += hits
+                    self.cache.misses += misses
+
+    def loaded_months(self):
+        """
+        Lists the months that are loaded for any Remfile
+
+        Returns
+        -------
+        array
+            (year, month) tuples of the loaded months
+        """
+        months = set()
+        for _, calendar in self.calendars:
+            months.update(calendar.loaded_months())
+        return sorted(months)
+
+    def release_range(self, start_date, end_date):
+        """
+        Evicts the loaded months of every Remfile for a range of days
+
+        Parameters
+        ----------
+        start_date : datetime
+            First day of the range
+        end_date : datetime
+            Last day of the range
+        """
+        for _, calendar in self.calendars:
+            calendar.release_range(start_date, end_date)
+
+    def refresh(self, lock=None, window=1):
+        """
+        Re-reads the stale months and reads back the evicted months next to
+        the most recently used one of every Remfile, for a background thread
+
+        Parameters
+        ----------
+        lock : Lock
+            Lock held by readers of this MultiRemData, or None
+        window : int
+            Number of months on each side of the most recently used month
+            to read back
+
+        Returns
+        -------
+        int
+            Number of months read
+        """
+        return sum(
+            calendar.refresh(lock, window) for _, calendar in self.calendars
+        )
+
+    def stats(self):
+        """
+        Gets a summary of the month storage of every Remfile
+
+        Returns
+        -------
+        string
+            Loaded months and hit/miss/eviction/refresh counts
+        """
+        totals = collections.Counter()
+        loaded = 0
+        for _, calendar in self.calendars:
+            totals.update(calendar.month_stats)
+            loaded += len(calendar.recent)
+        return (
+            "Months: %d loaded, %d hits, %d misses, %d evictions, "
+            "%d refreshes"
+        ) % (
+            loaded,
+            totals["hits"],
+            totals["misses"],
+            totals["evictions"],
+            totals["refreshes"],
+        )
+
+    def snapshot(self):
+        """
+        Gets the modification time and size of every file read by remind
+
+        Returns
+        -------
+        dict
+            Map of filename to (mtime, size)
+        """
+        snapshot = {}
+        for _, calendar in self.calendars:
+            snapshot.update(calendar.snapshot())
+        return snapshot
+
+    def get_day(self, year, month, day):
+        """
+        Gets the combined RemData of every Remfile for one day
+
+        Parameters
+        ----------
+        year : int
+            year
+        month : int
+            month
+        day : int
+            day
+
+        Returns
+        -------
+        array
+            Array of events for the day
+        """
+        events = []
+        for name, calendar in self.calendars:
+            calendar_events = calendar.get_day(year, month, day)
+            if calendar_events:
+                for event in calendar_events:
+                    event.source = name
+                events.extend(calendar_events)
+        return events or None
+
+    def get_range(self, start_date, end_date, load=True):
+        """
+        Gets the combined events of every Remfile for each day of a range
+        that has any
+
+        Parameters
+        ----------
+        start_date : datetime
+            First day of the range
+        end_date : datetime
+            Last day of the range
+        load : bool
+            Load the months of the range that are not loaded yet, rather
+            than leave them out
+
+        Returns
+        -------
+        array
+            (day ordinal, events) tuples, in order
+        """
+        if load:
+            self.load_range(
+                start_date, end_date.toordinal() - start_date.toordinal() + 1
+            )
+        days = {}
+        for name, calendar in self.calendars:
+            for ordinal, calendar_events in calendar.get_range(
+                start_date, end_date, load=False
+            ):
+                for event in calendar_events:
+                    event.source = name
+                days.setdefault(ordinal, []).extend(calendar_events)
+        return sorted(days.items())
+
+    def events_between(self, start, end):
+        """
+        Gets the timed events of every Remfile that overlap a span of time
+
+        Parameters
+        ----------
+        start : datetime
+            Start of the span
+        end : datetime
+            End of the span, not included
+
+        Returns
+        -------
+        array
+            Events, ordered by day and start
+        """
+        first_date = start - ONE_DAY
+        self.load_range(
+            first_date, end.toordinal() - first_date.toordinal() + 1
+        )
+        return self.merge_events(
+            lambda calendar: calendar.events_between(start, end)
+        )
+
+    def next_events(self, moment, days):
+        """
+        Gets the timed events of every Remfile that start first after a
+        moment
+
+        Parameters
+        ----------
+        moment : datetime
+            Moment to start looking from
+        days : int
+            Number of days to look ahead
+
+        Returns
+        -------
+        array
+            Events starting at the same time, or an empty array if none
+            start within days
+        """
+        self.load_range(moment, days)
+        events = self.merge_events(
+            lambda calendar: calendar.next_events(moment, days)
+        )
+        return [
+            event
+            for event in events
+            if event_start(event) == event_start(events[0])
+        ]
+
+    def merge_events(self, select):
+        """
+        Merges the events selected from each Remfile by day and start
+
+        Parameters
+        ----------
+        select : callable
+            Gets the events of one RemData, ordered by day and start
+
+        Returns
+        -------
+        array
+            Events of every Remfile, ordered by day and start
+        """
+        selected = []
+        for name, calendar in self.calendars:
+            events = select(calendar)
+            for event in events:
+                event.source = name
+            selected.append(events)
+        return list(heapq.merge(*selected, key=event_start))
+
+    def search(self, query, year, month):
+        """
+        Finds the events of a month in every Remfile matching a search string
+        through the token indexes
+
+        Parameters
+        ----------
+        query : string
+            Search string
+        year : int
+            year
+        month : int
+            month
+
+        Returns
+        -------
+        set
+            id() of each matching event, or None if the search string is a
+            regular expression that has to be checked against every event
+        """
+        if not is_plain_search(query):
+            return None
+        regex = re.compile(query, re.IGNORECASE)
+        found = set()
+        for name, calendar in self.calendars:
+            if query.lower() in name.lower():
+                # The calendar name is shown with, but not indexed for, events
+                calendar.get_day(year, month, 1)
+                events = [
+                    event
+                    for events in calendar.data[year][month].values()
+                    for event in events
+                ]
+            else:
+                events = calendar.candidates(query, year, month)
+            for event in events:
+                event.source = name
+                if regex.search(event_text(event)):
+                    found.add(id(event))
+        return found
+
+    def get_next_occurrences(self, limit=None, query=EMPTY_STRING):
+        """
+        Gets the next occurence of each event of every Remfile, soonest first
+
+        Parameters
+        ----------
+        limit : int
+            Only get the soonest limit occurrences, or all of them if None
+        query : string
+            Only get the occurrences whose text or calendar name matches this
+            regex
+
+        Returns
+        -------
+        iterator
+            String representation of next occurrences for each event.
+        """
+        return RemData.select_occurrences(
+            (
+                (event, name)
+                for name, calendar in self.calendars
+                for event in calendar.run_remind(
+                    "-n", calendar.remind_filename
+                )
+            ),
+            limit,
+            query,
+        )
+
+
+def load_calendar(rem_data, months, timed=False):
+    """
+    Loads months of one Remfile in a worker process
+
+    Parameters
+    ----------
+    rem_data : RemData
+        Empty RemData for the Remfile
+    months : array
+        (year, month) tuples to load
+    timed : bool
+        Record timings to hand back to the parent process
+
+    Returns
+    -------
+    tuple
+        The loaded data, the files remind read, the cache hits and misses
+        and the recorded timings
+    """
+    TIMINGS.reset()
+    TIMINGS.hooks = []
+    TIMINGS.enabled = timed
+    cache = rem_data.cache
+    if cache is not None:
+        cache.hits = cache.misses = 0
+    rem_data.load_months(months)
+    if cache is None:
+        return (
+            rem_data.data,
+            rem_data.index,
+            rem_data.depends,
+            0,
+            0,
+            TIMINGS.report(),
+        )
+    return (
+        rem_data.data,
+        rem_data.index,
+        rem_data.depends,
+        cache.hits,
+        cache.misses,
+        TIMINGS.report(),
+    )
+
+
+def calendar_names(remind_filenames):
+    """
+    Names each Remfile after its file name without the extension, or after
+    its full path when that name is not unique
+
+    Parameters
+    ----------
+    remind_filenames : array
+        Remfiles
+
+    Returns
+    -------
+    array
+        Name for each Remfile
+    """
+    names = [
+        os.path.splitext(os.path.basename(remind_filename))[0]
+        for remind_filename in remind_filenames
+    ]
+    return [
+        name if names.count(name) == 1 else remind_filename
+        for name, remind_filename in zip(names, remind_filenames)
+    ]
+
+
+class Timeline:
+    """
+    Events of the loaded months ordered by day ordinal, so a range of days
+    is found by bisection rather than by walking the range one day at a
+    time. The events of a day keep the order remind gave them. The timed
+    events are also sorted by their start, in minutes since the start of
+    the proleptic Gregorian calendar, when they are first searched. The
+    days of a month mapped from an event store are only read from the store
+    when their events are returned.
+    """
+
+    def __init__(self):
+        """__init__."""
+        self.months = set()
+        self.ordinals = []
+        self.days = []
+        self.starts = None
+        self.timed = None
+        self.longest = 0
+
+    def add_month(self, year, month, month_data):
+        """
+        Adds the events of a month
+
+        Parameters
+        ----------
+        year : int
+            year
+        month : int
+            month
+        month_data : dict
+            Map of day to the events of the day
+        """
+        self.months.add((year, month))
+        first = datetime.date(year, month, 1).toordinal()
+        days = sorted(month_data)
+        position = bisect.bisect_left(self.ordinals, first)
+        self.ordinals[position:position] = [first + day - 1 for day in days]
+        if isinstance(month_data, StoreMonth):
+            # The month stands in for each of its days until they are read
+            self.days[position:position] = [month_data] * len(days)
+        else:
+            self.days[position:position] = [month_data[day] for day in days]
+        self.starts = self.timed = None
+
+    def remove_month(self, year, month):
+        """
+        Removes the events of a month, if it was added
+
+        Parameters
+        ----------
+        year : int
+            year
+        month : int
+            month
+        """
+        if (year, month) not in self.months:
+            return
+        self.months.discard((year, month))
+        first = datetime.date(year, month, 1).toordinal()
+        low = bisect.bisect_left(self.ordinals, first)
+        high = bisect.bisect_left(
+            self.ordinals, first + days_in_month(year, month), low
+        )
+        del self.ordinals[low:high]
+        del self.days[low:high]
+        self.starts = self.timed = None
+
+    def get_range(self, first, last):
+        """
+        Gets the days of a range that have events
+
+        Parameters
+        ----------
+        first : int
+            Ordinal of the first day
+        last : int
+            Ordinal of the last day
+
+        Returns
+        -------
+        array
+            (day ordinal, events) tuples, in order
+        """
+        low = bisect.bisect_left(self.ordinals, first)
+        high = bisect.bisect_right(self.ordinals, last, low)
+        return [
+            (self.ordinals[position], self.day_events(position))
+            for position in range(low, high)
+        ]
+
+    def day_events(self, position):
+        """
+        Gets the events of a day, reading them from the event store if the
+        day is part of a month mapped from one
+
+        Parameters
+        ----------
+        position : int
+            Position of the day in the timeline
+
+        Returns
+        -------
+        array
+            Events of the day
+        """
+        events = self.days[position]
+        if isinstance(events, StoreMonth):
+            events = events[self.ordinals[position] - events.first_ordinal + 1]
+        return events
+
+    def sort_timed(self):
+        """
+        Sorts the timed events by their start, if not done since the last
+        month was added
+        """
+        if self.timed is not None:
+            return
+        self.timed = sorted(
+            (
+                event
+                for position in range(len(self.days))
+                for event in self.day_events(position)
+                if event.start is not None
+            ),
+            key=event_start,
+        )
+        self.starts = [event_start(event) for event in self.timed]
+        self.longest = max(
+            (event.duration_minutes for event in self.timed), default=0
+        )
+
+    def events_between(self, start, end):
+        """
+        Gets the timed events that overlap a span of time. Events without a
+        duration are included when they start within the span.
+
+        Parameters
+        ----------
+        start : int
+            Start of the span, in minutes
+        end : int
+            End of the span, in minutes, not included
+
+        Returns
+        -------
+        array
+            Events, ordered by day and start
+        """
+        self.sort_timed()
+        low = bisect.bisect_left(self.starts, start - self.longest)
+        high = bisect.bisect_left(self.starts, end, low)
+        return [
+            event
+            for event_minute, event in zip(
+                self.starts[low:high], self.timed[low:high]
+            )
+            if event_minute >= start
+            or event_minute + event.duration_minutes > start
+        ]
+
+    def next_events(self, moment):
+        """
+        Gets the timed events that start first after a moment
+
+        Parameters
+        ----------
+        moment : int
+            Moment, in minutes
+
+        Returns
+        -------
+        array
+            Events starting at the same time, or an empty array if none
+            start after moment
+        """
+        self.sort_timed()
+        low = bisect.bisect_right(self.starts, moment)
+        if low == len(self.starts):
+            return []
+        high = bisect.bisect_right(self.starts, self.starts[low], low)
+        return self.timed[low:high]
+
+
+def month_size(month_data):
+    """
+    Approximates the memory held by the events of a month. Months mapped
+    from an event store only count the days decoded so far.
+
+    Parameters
+    ----------
+    month_data : dict
+        Map of day to the events of the day
+
+    Returns
+    -------
+    int
+        Approximate size in bytes
+    """
+    if isinstance(month_data, StoreMonth):
+        month_data = month_data.days
+    size = sys.getsizeof(month_data)
+    for events in month_data.values():
+        size += sys.getsizeof(events)
+        for event in events:
+            size += sys.getsizeof(event) + sys.getsizeof(event.msg)
+    return size
+
+
+def event_start(event):
+    """
+    Gets the start of a timed event in minutes since the start of the
+    proleptic Gregorian calendar
+
+    Parameters
+    ----------
+    event : Event
+        Timed event
+
+    Returns
+    -------
+    int
+        Start of the event
+    """
+    return event.ordinal * 1440 + event.start
+
+
+def minute_of(moment):
+    """
+    Gets a moment in minutes since the start of the proleptic Gregorian
+    calendar
+
+    Parameters
+    ----------
+    moment : datetime
+        Moment
+
+    Returns
+    -------
+    int
+        Minutes, rounded down
+    """
+    return moment.toordinal() * 1440 + moment.hour * 60 + moment.minute
+
+
+class RemCache:
+    """
+    On-disk cache of parsed remind output, stored one file per month.
+
+    An entry is keyed on the remind binary, the remfile, the backend that
+    parsed it and the date it was computed for, and records the modification
+    time and size of every file remind read (the remfile, its INCLUDEs and
+    the binary itself). It is only used while all of those files are
+    unchanged.
+    """
+
+    # Constants
+    VERSION = 4
+    SUFFIX = ".pickle"
+
+    def __init__(self, cache_dir):
+        """__init__.
+
+        Parameters
+        ----------
+        cache_dir : string
+            Directory where the cache files are kept
+        """
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, remind_cmd, remind_filename, backend, year, month):
+        """
+        Gets the cache file for a month of reminders
+
+        Parameters
+        ----------
+        remind_cmd : string
+            Path of the Remind binary
+        remind_filename : string
+            Path of the Remind filename to read
+        backend : string
+            "rls", "json" or "native", how the Remfile is read
+        year : int
+            year
+        month : int
+            month
+
+        Returns
+        -------
+        string
+            Path of the cache file
+        """
+        today = datetime.date.today().isoformat()
+        key = repr(
+            (
+                self.VERSION,
+                remind_cmd,
+                os.path.abspath(remind_filename),
+                backend,
+                year,
+                month,
+            )
+        )
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(
+            self.cache_dir, "%s-%s%s" % (today, digest, self.SUFFIX)
+        )
+
+    @staticmethod
+    def signature(filename):
+        """
+        Gets the modification time and size of a file
+
+        Parameters
+        ----------
+        filename : string
+            File to check
+
+        Returns
+        -------
+        tuple
+            (mtime, size) of the file or None if it does not exist
+        """
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self, remind_cmd, remind_filename, backend, year, month):
+        """
+        Gets the cached reminders for one month
+
+        Parameters
+        ----------
+        remind_cmd : string
+            Path of the Remind binary
+        remind_filename : string
+            Path of the Remind filename to read
+        backend : string
+            "rls", "json" or "native", how the Remfile is read
+        year : int
+            year
+        month : int
+            month
+
+        Returns
+        -------
+        dict
+            Entry with the map of day to events as "data" and the files it
+            depends on as "depends", or None if there is no valid entry
+        """
+        try:
+            with open(
+                self.path(remind_cmd, remind_filename, backend, year, month),
+                "rb",
+            ) as cache_file:
+                entry = pickle.load(cache_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            TIMINGS.count("cache_misses")
+            return None
+
+        for filename, signature in entry["depends"].items():
+            if self.signature(filename) != signature:
+                self.misses += 1
+                TIMINGS.count("cache_misses")
+                return None
+
+        self.hits += 1
+        TIMINGS.count("cache_hits")
+        return entry
+
+    def store(
+        self,
+        remind_cmd,
+        remind_filename,
+        backend,
+        year,
+        month,
+        data,
+        depends,
+        index,
+    ):
+        """
+        Saves the reminders for one month
+
+        Parameters
+        ----------
+        remind_cmd : string
+            Path of the Remind binary
+        remind_filename : string
+            Path of the Remind filename to read
+        backend : string
+            "rls", "json" or "native", how the Remfile is read
+        year : int
+            year
+        month : int
+            month
+        data : dict
+            Map of day to events
+        depends : set
+            Files read by remind while producing the events
+        index : dict
+            Token index of the events, or None if not built
+        """
+        binary = shutil.which(remind_cmd) or remind_cmd
+        entry = {
+            "depends": {
+                filename: self.signature(filename)
+                for filename in depends | {binary}
+            },
+            "data": data,
+            "index": index,
+        }
+        path = self.path(remind_cmd, remind_filename, backend, year, month)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.prune()
+            tmp_path = "%s.%d" % (path, os.getpid())
+            with open(tmp_path, "wb") as cache_file:
+                pickle.dump(entry, cache_file, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The cache is an optimisation only
+            pass
+
+    def prune(self):
+        """
+        Removes cache files computed for earlier dates
+        """
+        today = datetime.date.today().isoformat()
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(self.SUFFIX) and not filename.startswith(
+                today
+            ):
+                try:
+                    os.remove(os.path.join(self.cache_dir, filename))
+                except OSError:
+                    pass
+
+    def stats(self):
+        """
+        Gets a summary of the cache usage
+
+        Returns
+        -------
+        string
+            Hit/miss counts
+        """
+        return "Cache: %d hits, %d misses" % (self.hits, self.misses)
+
+
+class EventStore:
+    """
+    Binary file of compiled remind output, read through mmap.
+
+    The file holds a header, a JSON description of what it was compiled
+    from, an index with the first record of each day, fixed-width event
+    records and a table of the strings they refer to. Opening it only reads
+    the header and description, and a day's records are unpacked straight
+    from the mapping the first time the day is read.
     """
 
     # Constants
-    DATE_FMT = "%a %d %b %Y"
-    LEADING_ZERO = re.compile(r"^0")
-    NUM_MONTHS = 4
-    REGAT = re.compile(r"\s+at.*$")
-    LEADING_ZERO = re.compile(r"^0")
+    MAGIC = b"REMSTORE"
+    VERSION = 1
 
-    # Variables
-    data = {}
-    found_list = []
-    last_found = EMPTY_STRING
-    next_item = 0
-    remind_filename = EMPTY_STRING
-    remind_cmd = EMPTY_STRING
-    search_str = EMPTY_STRING
-    start_date = EMPTY_STRING
+    # magic, version, first day ordinal, days, records, description length
+    HEADER = struct.Struct("<8sIIIII")
+    INDEX = struct.Struct("<I")
 
-    # Since remind only recognizes English month abbreviations but python gives
-    # the appropriate Locale version.
-    month_abbr = {
-        "01": "Jan",
-        "02": "Feb",
-        "03": "Mar",
-        "04": "Apr",
-        "05": "May",
-        "06": "Jun",
-        "07": "Jul",
-        "08": "Aug",
-        "09": "Sep",
-        "10": "Oct",
-        "11": "Nov",
-        "12": "Dec",
-    }
+    # ordinal, start, duration, line number, then offset and length in the
+    # string table of the message, filename, special and tag
+    RECORD = struct.Struct("<iiii8I")
 
-    def __init__(self, remind_cmd, remind_filename):
+    def __init__(self, path):
         """__init__.
 
+        Parameters
+        ----------
+        path : string
+            Path of the event store
+
+        Raises
+        ------
+        RuntimeError
+            If the file is not an event store of this version
+        """
+        msg = "%s is not a version %d event store" % (path, self.VERSION)
+        with open(path, "rb") as store_file:
+            try:
+                self.buffer = mmap.mmap(
+                    store_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            except ValueError:
+                # An empty file cannot be mapped
+                raise RuntimeError(msg)
+        try:
+            (
+                magic,
+                version,
+                self.first_ordinal,
+                self.days,
+                self.records,
+                description_length,
+            ) = self.HEADER.unpack_from(self.buffer)
+        except struct.error:
+            magic = version = None
+        if magic != self.MAGIC or version != self.VERSION:
+            raise RuntimeError(msg)
+
+        offset = self.HEADER.size
+        try:
+            description = json.loads(
+                self.buffer[offset : offset + description_length]
+            )
+            self.remind_cmd = description["remind_cmd"]
+            self.remind_filename = description["remind_filename"]
+            self.signatures = {
+                filename: tuple(signature) if signature else None
+                for filename, signature in description["depends"].items()
+            }
+            self.months = {tuple(month) for month in description["months"]}
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # A truncated or corrupt description
+            raise RuntimeError(msg)
+        self.depends = set(self.signatures)
+
+        self.index_offset = offset + description_length
+        self.records_offset = (
+            self.index_offset + (self.days + 1) * self.INDEX.size
+        )
+        self.strings_offset = (
+            self.records_offset + self.records * self.RECORD.size
+        )
+
+    def covers(self, year, month):
+        """
+        Whether the store holds a month
+
+        Parameters
+        ----------
+        year : int
+            year
+        month : int
+            month
+
+        Returns
+        -------
+        bool
+            True if the month was compiled into the store
+        """
+        return (year, month) in self.months
+
+    def fresh(self, remind_cmd, remind_filename):
+        """
+        Whether the store was compiled from a Remfile and is up to date
+
         Parameters
         ----------
         remind_cmd : string
             Path of the Remind binary
         remind_filename : string
             Path of the Remind filename to read
+
+        Returns
+        -------
+        bool
+            True if the store was compiled by the same remind from the same
+            Remfile, and none of the files remind read changed since
         """
-        self.remind_cmd = remind_cmd
-        self.remind_filename = remind_filename
-        start_month, start_year = self.get_months()
+        return (
+            self.remind_cmd == remind_cmd
+            and self.remind_filename == os.path.abspath(remind_filename)
+            and all(
+                RemCache.signature(filename) == signature
+                for filename, signature in self.signatures.items()
+            )
+        )
+
+    def month(self, year, month):
+        """
+        Gets the days of a month in the store
+
+        Parameters
+        ----------
+        year : int
+            year
+        month : int
+            month
 
-        self.slurp(start_year, start_month, self.NUM_MONTHS)
+        Returns
+        -------
+        StoreMonth
+            Map of day to events, read from the store as days are accessed
+        """
+        return StoreMonth(self, year, month)
 
-    def get_months(self):
+    def day_range(self, ordinal):
         """
-        Gets the start month/year for the reminders
+        Gets the records of a day
+
+        Parameters
+        ----------
+        ordinal : int
+            Proleptic Gregorian ordinal of the day
 
         Returns
         -------
-        int
-            starting month
-        int
-            starting year
+        range
+            Numbers of the records of the day, empty if there are none
+        """
+        day = ordinal - self.first_ordinal
+        if day < 0 or day >= self.days:
+            return range(0)
+        offset = self.index_offset + day * self.INDEX.size
+        return range(
+            self.INDEX.unpack_from(self.buffer, offset)[0],
+            self.INDEX.unpack_from(self.buffer, offset + self.INDEX.size)[0],
+        )
 
+    def events(self, ordinal):
         """
-        self.data = {}
-        today = datetime.date.today()
-        year, month = list(map(int, today.strftime("%Y %m").split()))
-        if month == 1:
-            start_month = 12
-            start_year = year - 1
+        Reads the events of a day
+
+        Parameters
+        ----------
+        ordinal : int
+            Proleptic Gregorian ordinal of the day
+
+        Returns
+        -------
+        array
+            Events of the day, in the order remind gave them
+        """
+        events = []
+        for record in self.day_range(ordinal):
+            fields = self.RECORD.unpack_from(
+                self.buffer, self.records_offset + record * self.RECORD.size
+            )
+            strings = [
+                self.string(*fields[field : field + 2])
+                for field in range(4, 12, 2)
+            ]
+            events.append(
+                Event(
+                    fields[0],
+                    None if fields[1] < 0 else fields[1],
+                    None if fields[2] < 0 else fields[2],
+                    strings[0],
+                    strings[1],
+                    fields[3],
+                    strings[2],
+                    strings[3],
+                )
+            )
+        return events
+
+    def string(self, offset, length):
+        """
+        Reads a string of the string table
+
+        Parameters
+        ----------
+        offset : int
+            Offset of the string in the table
+        length : int
+            Length of the encoded string
+
+        Returns
+        -------
+        string
+            The string
+        """
+        start = self.strings_offset + offset
+        return self.buffer[start : start + length].decode("utf-8")
+
+    @classmethod
+    def write(cls, path, rem_data):
+        """
+        Compiles the loaded months of a RemData into an event store
+
+        Parameters
+        ----------
+        path : string
+            Path of the event store
+        rem_data : RemData
+            Reminder data with the months to compile loaded
+        """
+        months = sorted(rem_data.loaded_months())
+        if months:
+            first = datetime.date(*months[0], 1).toordinal()
+            last_year, last_month = months[-1]
+            last = datetime.date(
+                last_year, last_month, days_in_month(last_year, last_month)
+            ).toordinal()
         else:
-            start_month = month - 1
-            start_year = year
+            first, last = 0, -1
 
-        return start_month, start_year
+        binary = shutil.which(rem_data.remind_cmd) or rem_data.remind_cmd
+        description = json.dumps(
+            {
+                "remind_cmd": rem_data.remind_cmd,
+                "remind_filename": os.path.abspath(rem_data.remind_filename),
+                "depends": {
+                    filename: RemCache.signature(filename)
+                    for filename in rem_data.depends
+                    | {rem_data.remind_filename, binary}
+                },
+                "months": months,
+            }
+        ).encode("utf-8")
 
-    def get_day(self, year, month, day):
+        index = bytearray()
+        records = bytearray()
+        strings = bytearray()
+        offsets = {}
+
+        def add_string(text):
+            if text not in offsets:
+                encoded = text.encode("utf-8")
+                offsets[text] = (len(strings), len(encoded))
+                strings.extend(encoded)
+            return offsets[text]
+
+        count = 0
+        days = {}
+        if months:
+            days = dict(
+                rem_data.get_range(
+                    datetime.date.fromordinal(first),
+                    datetime.date.fromordinal(last),
+                    load=False,
+                )
+            )
+        for ordinal in range(first, last + 1):
+            index.extend(cls.INDEX.pack(count))
+            for event in days.get(ordinal, ()):
+                records.extend(
+                    cls.RECORD.pack(
+                        ordinal,
+                        -1 if event.start is None else event.start,
+                        -1 if event.duration is None else event.duration,
+                        event.line_num,
+                        *add_string(event.msg),
+                        *add_string(event.filename),
+                        *add_string(event.special),
+                        *add_string(event.tag),
+                    )
+                )
+                count += 1
+        index.extend(cls.INDEX.pack(count))
+
+        tmp_path = "%s.%d" % (path, os.getpid())
+        with open(tmp_path, "wb") as store_file:
+            store_file.write(
+                cls.HEADER.pack(
+                    cls.MAGIC,
+                    cls.VERSION,
+                    max(first, 0),
+                    last - first + 1,
+                    count,
+                    len(description),
+                )
+            )
+            store_file.write(description)
+            store_file.write(index)
+            store_file.write(records)
+            store_file.write(strings)
+        os.replace(tmp_path, path)
+
+
+class StoreMonth(collections.abc.Mapping):
+    """
+    Read-only map of day to events for one month of an EventStore, used in
+    place of the dict built from remind output. Each day's events are read
+    from the store once and then kept, so they are the same objects every
+    time the day is read.
+    """
+
+    def __init__(self, store, year, month):
+        """__init__.
+
+        Parameters
+        ----------
+        store : EventStore
+            Store holding the month
+        year : int
+            year
+        month : int
+            month
         """
-        Gets RemData for one day
+        self.store = store
+        self.first_ordinal = datetime.date(year, month, 1).toordinal()
+        self.length = days_in_month(year, month)
+        self.days = {}
+
+    def __getitem__(self, day):
+        events = self.days.get(day)
+        if events is None:
+            if not isinstance(day, int) or not 1 <= day <= self.length:
+                raise KeyError(day)
+            events = self.store.events(self.first_ordinal + day - 1)
+            if not events:
+                raise KeyError(day)
+            self.days[day] = events
+        return events
+
+    def __iter__(self):
+        for day in range(1, self.length + 1):
+            if self.store.day_range(self.first_ordinal + day - 1):
+                yield day
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class Timings:
+    """
+    Wall time spent in each phase and counts of the work done, reported by
+    --timings. Library users can follow the same figures as they are
+    recorded by registering a callback with add_hook.
+
+    Nothing is recorded unless enabled or a hook is registered.
+    """
+
+    # Phases that make up the output phase, in the order they are reported
+    PHASES = ("remind", "parse", "cache", "index", "mark")
+
+    def __init__(self):
+        """__init__."""
+        self.enabled = False
+        self.hooks = []
+        self.phases = {}
+        self.counters = {}
+
+    @property
+    def active(self):
+        """
+        Whether anything is being recorded
+
+        Returns
+        -------
+        bool
+            True if enabled or a hook is registered
+        """
+        return self.enabled or bool(self.hooks)
+
+    def add_hook(self, callback):
+        """
+        Registers a callback, called as callback(kind, name, value) with kind
+        "phase" and the seconds of one run of a phase, "count" and the amount
+        added to a counter or "peak" and a candidate for a maximum
+
+        Parameters
+        ----------
+        callback : callable
+            Function to call
+        """
+        self.hooks.append(callback)
+
+    def remove_hook(self, callback):
+        """
+        Unregisters a callback added with add_hook
+
+        Parameters
+        ----------
+        callback : callable
+            Function to remove
+        """
+        self.hooks.remove(callback)
+
+    def reset(self):
+        """
+        Forgets everything recorded so far
+        """
+        self.phases = {}
+        self.counters = {}
+
+    @contextlib.contextmanager
+    def phase(self, name, exclude=None):
+        """
+        Context manager timing the code it wraps as one run of a phase
+
+        Parameters
+        ----------
+        name : string
+            Name of the phase
+        exclude : string
+            Phase whose time recorded meanwhile is not counted towards this
+            one
+        """
+        if not self.active:
+            yield
+            return
+
+        excluded = self.seconds(exclude)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(
+                name,
+                time.perf_counter()
+                - started
+                - (self.seconds(exclude) - excluded),
+            )
+
+    def iterate(self, name, iterable):
+        """
+        Iterates over iterable, timing the wait for each item as one run of
+        a phase
 
         Parameters
         ----------
-        year : int
-            year
-        month : int
-            month
-        day : int
-            day
+        name : string
+            Name of the phase
+        iterable : iterable
+            Items to iterate over
 
-        Returns
-        -------
-        array
-            Array of events for the day
+        Yields
+        ------
+        object
+            Each item of iterable
         """
-        if year not in self.data or month not in self.data[year]:
-            self.slurp(year, month, 1)
+        if not self.active:
+            yield from iterable
+            return
 
+        waited = 0.0
+        iterator = iter(iterable)
         try:
-            return self.data[year][month][day]
-        except KeyError:
-            return None
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    waited += time.perf_counter() - started
+                yield item
+        finally:
+            self.add_time(name, waited)
 
-    def get_next_occurrences(self):
+    def seconds(self, name):
         """
-        Gets list of next occurence for each event
+        Gets the time recorded for a phase
+
+        Parameters
+        ----------
+        name : string
+            Name of the phase, or None
 
         Returns
         -------
-        string
-            String representation of next occurrences for each event.
+        float
+            Seconds recorded
         """
-        command = "%s -n %s | sort" % (self.remind_cmd, self.remind_filename)
-        events = subprocess.getoutput(command).split("\n")
-        next_events = []
-        for event in events:
-            parts = event.split()
-            year, month, day = list(map(int, parts[0].split("/")))
-            parts[0] = datetime.date(year, month, day).strftime(self.DATE_FMT)
-            next_events.append(" ".join(parts))
-        res = "\n".join(next_events)
-        return res
+        return self.phases.get(name, (0.0, 0))[0]
 
-    def slurp(self, start_year, start_month, months):
+    def add_time(self, name, seconds):
         """
-        Get Data from Remind output and put in Python datastructures
+        Records one run of a phase
 
         Parameters
         ----------
-        start_year : int
-            Year where reminders should start
-        start_month : int
-            Month in the year where the reminders should start
-        months : int
-            Number of months to create reminders for
+        name : string
+            Name of the phase
+        seconds : float
+            Duration of the run
         """
-        # start_year, start_month, months = list(map(int, (y, m, n)))
-        start_month = "%02d" % start_month
-        # Slurp remind output for the relevant date and number of months
-        command = "%s -b2 -rls%s %s %s %s" % (
-            self.remind_cmd,
-            months,
-            self.remind_filename,
-            self.month_abbr[start_month],
-            start_year,
-        )
-        lines = subprocess.getoutput(command).split("\n")
-        self.process_slurp(lines)
+        total, runs = self.phases.get(name, (0.0, 0))
+        self.phases[name] = (total + seconds, runs + 1)
+        for hook in self.hooks:
+            hook("phase", name, seconds)
 
-    def process_slurp(self, lines):
+    def count(self, name, amount=1):
         """
-        Processes data slurped from the remind command
+        Adds to a counter
 
         Parameters
         ----------
-        lines : array
-            Output of Remind Command
+        name : string
+            Name of the counter
+        amount : int
+            Amount to add
+        """
+        if not self.active:
+            return
+        self.counters[name] = self.counters.get(name, 0) + amount
+        for hook in self.hooks:
+            hook("count", name, amount)
 
-        Raises
-        ------
-        RuntimeError
-            If there is an issue with the Remind command or the output,
-            raises a runtime error
+    def peak(self, name, value):
         """
-        line_num = 0
-        filename = EMPTY_STRING
+        Raises a counter that holds a maximum
 
-        for line in lines:
-            parts = line.split()
+        Parameters
+        ----------
+        name : string
+            Name of the counter
+        value : int
+            Candidate maximum
+        """
+        if not self.active:
+            return
+        self.counters[name] = max(self.counters.get(name, value), value)
+        for hook in self.hooks:
+            hook("peak", name, value)
 
-            # Determine if the line is describing the file
-            if line != EMPTY_STRING and parts[1] == "fileinfo":
-                line_num, filename = parts[2:4]
-                # go to the next line for the item details
-                continue
+    def merge(self, report):
+        """
+        Adds the figures recorded by another process
 
-            # Determine if line is valid
-            self.validate_data_line(parts)
+        Parameters
+        ----------
+        report : dict
+            Output of report() in the other process
+        """
+        for name, phase in report["phases"].items():
+            total, runs = self.phases.get(name, (0.0, 0))
+            self.phases[name] = (
+                total + phase["seconds"],
+                runs + phase["runs"],
+            )
+            for hook in self.hooks:
+                hook("phase", name, phase["seconds"])
+        for name, value in report["counters"].items():
+            if name.startswith("max_"):
+                self.peak(name, value)
+            else:
+                self.count(name, value)
 
-            # Populate local variables
-            special, tag = parts[1:3]
-            special = EMPTY_STRING if special == "*" else special.strip()
-            tag = EMPTY_STRING if tag == "*" else tag.strip()
-            start_time, end_time, duration = self.get_event_details(parts)
+    def report(self):
+        """
+        Gets everything recorded
 
-            if start_time and end_time:
-                interval = "-"
-            else:
-                interval = EMPTY_STRING
-
-            # The following creates a value for data[year][month][day]
-            # creating year, month and day keys when necessary.
-            year, month, day = list(map(int, parts[0].split("/")))
-
-            self.data.setdefault(year, {}).setdefault(month, {}).setdefault(
-                day, []
-            ).append(
-                [
-                    start_time,  # Start Time
-                    interval,  # Interval
-                    end_time,  # End Time
-                    " ".join(parts[5:]),  # Msg
-                    filename,  # Filename
-                    line_num,  # Line Num
-                    duration,  # Duration Minutes
-                    parts[4],  # Start Minutes
-                    special,  # Special
-                    tag,  # Tag
-                ]
-            )
+        Returns
+        -------
+        dict
+            "phases" maps each phase to its "seconds" and "runs", and
+            "counters" maps each counter to its value
+        """
+        return {
+            "phases": {
+                name: {"seconds": total, "runs": runs}
+                for name, (total, runs) in self.phases.items()
+            },
+            "counters": dict(self.counters),
+        }
 
-    @staticmethod
-    def validate_data_line(parts):
+    def summary(self, output_format="text"):
         """
-        Determines if the row is skippable or raises an exception if the data is
-        unparsable.
+        Gets a summary of everything recorded
 
         Parameters
         ----------
-        parts : array
-            Array of data from the output line
+        output_format : string
+            "text" or "json"
 
-        Raises
-        ------
-        RuntimeError
-            If there was an issue parsing the result
+        Returns
+        -------
+        string
+            The phases, followed by the time left for rendering the output,
+            and the counters
         """
+        if output_format == "json":
+            return json.dumps(self.report(), sort_keys=True)
 
-        if len(parts) == 0:
-            msg = "Line should not be empty"
-            raise RuntimeError(msg)
+        lines = ["Timings:"]
+        for name in self.PHASES:
+            if name in self.phases:
+                total, runs = self.phases[name]
+                lines.append("  %-8s %9.4fs %7d runs" % (name, total, runs))
+        if "output" in self.phases:
+            rest = self.seconds("output") - sum(
+                self.seconds(name) for name in self.PHASES
+            )
+            lines.append("  %-8s %9.4fs" % ("render", max(rest, 0.0)))
+            lines.append("  %-8s %9.4fs" % ("total", self.seconds("output")))
+        for name, value in sorted(self.counters.items()):
+            lines.append("  %-18s %d" % (name, value))
+        if self.counters.get("days"):
+            lines.append(
+                "  %-18s %.1f"
+                % (
+                    "events_per_day",
+                    self.counters.get("events", 0) / self.counters["days"],
+                )
+            )
+        return "\n".join(lines)
 
-        if parts[0] == REMIND:
-            msg = "Fatal error running remind command"
-            raise RuntimeError(msg)
 
+TIMINGS = Timings()
+
+
+def days_in_month(year, month):
+    """
+    Number of days in a month
+
+    Parameters
+    ----------
+    year : int
+        year
+    month : int
+        month
+
+    Returns
+    -------
+    int
+        Number of days
+    """
+    next_year, next_month = month_span(year, month, 2)[1]
+    return (
+        datetime.date(next_year, next_month, 1) - datetime.date(year, month, 1)
+    ).days
+
+
+def month_span(start_year, start_month, months):
+    """
+    List the months in a range
+
+    Parameters
+    ----------
+    start_year : int
+        Year of the first month
+    start_month : int
+        First month
+    months : int
+        Number of months in the range
+
+    Returns
+    -------
+    array
+        (year, month) tuples for each month in the range
+    """
+    span = []
+    for offset in range(int(months)):
+        year, month = divmod(start_month - 1 + offset, 12)
+        span.append((start_year + year, month + 1))
+    return span
+
+
+class RemServer:
+    """
+    Answers agenda queries over a Unix socket from one long-lived RemData.
+
+    A client sends its command line arguments as a JSON array on a single
+    line and receives a JSON object with the "status", "stdout" and "stderr"
+    the same query would have produced on the command line. The remfile and
+    every file it includes are polled in the background: the months read
+    from a file that changed are read again, as are evicted months next to
+    the most recently used one when there is room for them. When the date
+    rolls over the loaded months are read again into a fresh RemData which
+    then replaces the current one.
+    """
+
+    def __init__(self, socket_path, rem_data, poll_interval):
+        """__init__.
+
+        Parameters
+        ----------
+        socket_path : string
+            Path of the Unix socket to listen on
+        rem_data : RemData
+            Reminder data to answer queries from
+        poll_interval : float
+            Seconds between checks of the Remfile for changes
+        """
+        self.socket_path = socket_path
+        self.rem_data = rem_data
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def run(self):
+        """
+        Serves queries until interrupted
+        """
+        server = RemServer.Listener(self.socket_path, RemServer.Handler)
+        server.rem_server = self
+        watcher = threading.Thread(target=self.watch, daemon=True)
+        watcher.start()
         try:
-            list(map(int, parts[0].split("/")))
-        except RuntimeError as remind_exception:
-            msg = "Error parsing remind output"
-            raise RuntimeError(msg) from remind_exception
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stopped.set()
+            server.server_close()
+            os.remove(self.socket_path)
+
+    def watch(self):
+        """
+        Reloads the reminders whenever the files remind reads change or the
+        date rolls over
+        """
+        today = datetime.date.today()
+        while not self.stopped.wait(self.poll_interval):
+            rem_data = self.rem_data
+            if datetime.date.today() == today:
+                try:
+                    rem_data.refresh(self.lock)
+                except RuntimeError as remind_exception:
+                    # Keep answering from the old data until the files change
+                    with self.lock:
+                        print(remind_exception, file=sys.stderr)
+                continue
+
+            today = datetime.date.today()
+            fresh = rem_data.clone()
+            try:
+                fresh.load_months(rem_data.loaded_months())
+            except RuntimeError as remind_exception:
+                # Keep answering from the old data until the files change
+                with self.lock:
+                    print(remind_exception, file=sys.stderr)
+                continue
+            with self.lock:
+                self.rem_data = fresh
 
-    def get_event_details(self, parts):
+    def query(self, argv):
         """
-        Gets the event details for a given event.
+        Runs one query
 
         Parameters
         ----------
-        parts : array
-            raw event details
+        argv : array
+            Command line arguments of the query
 
         Returns
         -------
-        string
-            start_time of the event
+        dict
+            status, stdout and stderr of the query
+        """
+        with self.lock:
+            return answer_query(self.rem_data, argv)
 
-        string
-            end_time of the event
+    class Listener(socketserver.UnixStreamServer):
+        """
+        Unix socket server that replaces a stale socket file and keeps the
+        socket private to the user
+        """
 
-        int
-            duration of the event
+        def server_bind(self):
+            if os.path.exists(self.server_address):
+                probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    probe.connect(self.server_address)
+                except OSError:
+                    os.remove(self.server_address)
+                else:
+                    msg = "A server is already listening on %s" % (
+                        self.server_address
+                    )
+                    raise RuntimeError(msg)
+                finally:
+                    probe.close()
+            umask = os.umask(0o077)
+            try:
+                super().server_bind()
+            finally:
+                os.umask(umask)
+
+    class Handler(socketserver.StreamRequestHandler):
         """
-        year, month, day = list(map(int, parts[0].split("/")))
-        duration, start_minutes = parts[3:5]
-
-        if start_minutes != "*":
-            start_minutes = int(start_minutes)
-            start_time = datetime.datetime(
-                year, month, day, int(start_minutes / 60), start_minutes % 60
-            )
-            if duration != "*":
-                duration = int(duration)
-                durationdelta = datetime.timedelta(
-                    hours=duration / 60,
-                    minutes=duration % 60,
-                )
-                end = start_time + durationdelta
-                end_time = end.strftime(TIME_FMT)
-                if TWELVE_HOUR:
-                    end_time = self.LEADING_ZERO.sub(" ", end_time)
+        Reads one query from a client and writes back its result
+        """
+
+        def handle(self):
+            try:
+                argv = json.loads(self.rfile.readline().decode("utf-8"))
+            except ValueError:
+                return
+            reply = self.server.rem_server.query(argv)
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+def query_arguments(rem_data, argv):
+    """
+    Parses the command line of a query for reminder data that is already
+    loaded, which answers only for its own Remfiles
+
+    Parameters
+    ----------
+    rem_data : RemData
+        Reminder data the query is answered from
+    argv : array
+        Command line arguments of the query, without the Remfiles
+
+    Returns
+    -------
+    dict
+        A map of the processed arguments
+
+    Raises
+    ------
+    RuntimeError
+        If the query names other Remfiles
+    """
+    remind_filenames = rem_data.remind_filenames()
+    arguments = parse_arguments(["-r"] + remind_filenames + argv)
+    if list(map(os.path.abspath, expand_remfiles(arguments.remfile))) != list(
+        map(os.path.abspath, remind_filenames)
+    ):
+        msg = "Only queries for %s are answered" % " ".join(remind_filenames)
+        raise RuntimeError(msg)
+    return arguments
+
+
+def answer_query(rem_data, argv, arguments=None, memo=None):
+    """
+    Runs one query against reminder data that is already loaded, capturing
+    what it prints
+
+    Parameters
+    ----------
+    rem_data : RemData
+        Reminder data the query is answered from
+    argv : array
+        Command line arguments of the query, without the Remfiles
+    arguments : dict
+        argv already parsed by query_arguments, or None to parse it here
+    memo : dict
+        Free/busy rows and summaries already rendered for each day, passed
+        on to generate_output, or None
+
+    Returns
+    -------
+    dict
+        status, stdout and stderr of the query, and refused if it names
+        other Remfiles
+    """
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    status = 0
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(
+        stderr
+    ):
+        try:
+            if arguments is None:
+                try:
+                    arguments = query_arguments(rem_data, argv)
+                except RuntimeError as refusal:
+                    print(refusal, file=sys.stderr)
+                    return {
+                        "status": 1,
+                        "stdout": EMPTY_STRING,
+                        "stderr": stderr.getvalue(),
+                        "refused": True,
+                    }
+            TIMINGS.reset()
+            TIMINGS.enabled = bool(arguments.timings)
+            with TIMINGS.phase("output"):
+                generate_output(arguments, rem_data, memo)
+            if rem_data.cache is not None and arguments.cache_stats:
+                print(rem_data.cache.stats(), file=sys.stderr)
+            if arguments.timings:
+                print(TIMINGS.summary(arguments.timings), file=sys.stderr)
+        except SystemExit as exit_exception:
+            status = exit_exception.code
+        except (RuntimeError, ValueError) as query_exception:
+            print(query_exception, file=sys.stderr)
+            status = 1
+        except Exception as query_exception:
+            # Any failure is a reply, so a server keeps answering
+            print(
+                "%s: %s" % (type(query_exception).__name__, query_exception),
+                file=sys.stderr,
+            )
+            status = 1
+    return {
+        "status": status,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+    }
+
+
+def run_batch(arguments, rem_data):
+    """
+    Answers a file of queries, one command line of options for each line,
+    from a single load of every month they read. The output of each query
+    follows a "==> query <==" line, with a blank line between queries.
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments passed on the command line
+    rem_data : RemData
+        Reminder data the queries are answered from
+
+    Returns
+    -------
+    int
+        0 if every query succeeded, otherwise 1
+    """
+    try:
+        with contextlib.ExitStack() as stack:
+            source = sys.stdin
+            if arguments.batch != "-":
+                source = stack.enter_context(open(arguments.batch))
+            lines = [line.strip() for line in source]
+    except OSError as batch_exception:
+        sys.exit("Unable to read queries: %s" % batch_exception)
+
+    # Parse every query first, to load the months they read in one go.
+    # Queries that fail are parsed again when answered, for their errors.
+    queries = []
+    months = set()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        for line in lines:
+            try:
+                argv = shlex.split(line, comments=True)
+            except ValueError:
+                queries.append((line, None, None))
+                continue
+            if not argv:
+                continue
+            try:
+                query = query_arguments(rem_data, argv)
+            except (SystemExit, RuntimeError, ValueError):
+                query = None
             else:
-                end_time = EMPTY_STRING
-                duration = 0
-            start_time = start_time.strftime(TIME_FMT)
-            if TWELVE_HOUR:
-                start_time = self.LEADING_ZERO.sub(" ", start_time)
+                months.update(query_months(query))
+            queries.append((line, argv, query))
+
+    try:
+        with TIMINGS.phase("load"):
+            rem_data.load_months(months)
+    except RuntimeError as remind_exception:
+        sys.exit(str(remind_exception))
+
+    # Days rendered alike are shared by queries using the same hours,
+    # search and file details
+    memos = collections.defaultdict(dict)
+    out = sys.stdout
+    failed = False
+    for number, (line, argv, query) in enumerate(queries):
+        if argv is None:
+            reply = {
+                "status": 1,
+                "stdout": EMPTY_STRING,
+                "stderr": "Unable to split query: %s\n" % line,
+            }
         else:
-            start_time = EMPTY_STRING
-            end_time = EMPTY_STRING
-            duration = FIFTEEN_MINUTES
+            memo = None
+            if query is not None:
+                memo = memos[
+                    (
+                        query.agenda_start_hour,
+                        query.agenda_end_hour,
+                        query.fileinfo,
+                        query.search,
+                    )
+                ]
+            reply = answer_query(rem_data, argv, query, memo)
+        header = "%s==> %s <==\n" % ("\n" if number else EMPTY_STRING, line)
+        out.write(header)
+        out.write(reply["stdout"])
+        if reply["stderr"]:
+            sys.stderr.write(header.lstrip("\n"))
+            sys.stderr.write(reply["stderr"])
+        failed = failed or bool(reply["status"])
+    return 1 if failed else 0
+
+
+def query_months(arguments):
+    """
+    List the months a query reads
+
+    Parameters
+    ----------
+    arguments : dict
+        Arguments of the query
+
+    Returns
+    -------
+    array
+        (year, month) tuples, empty for queries that only run remind
+    """
+    days = int(arguments.days)
+    if arguments.next_occurrences or days < 1:
+        return []
+
+    first_date = arguments.begin
+    if arguments.now:
+        first_date = datetime.datetime.now()
+
+    # These also read the day before, for events running past midnight
+    if arguments.find_free or arguments.stats or arguments.now:
+        first_date -= ONE_DAY
+        days += 1
+
+    last_date = first_date + (days - 1) * ONE_DAY
+    months = (last_date.year - first_date.year) * 12 + (
+        last_date.month - first_date.month
+    )
+    return month_span(first_date.year, first_date.month, months + 1)
+
+
+def run_client(socket_path, argv):
+    """
+    Sends a query to a RemServer and prints its result
 
-        return start_time, end_time, duration
+    Parameters
+    ----------
+    socket_path : string
+        Path of the Unix socket the server listens on
+    argv : array
+        Command line arguments of the query
+
+    Returns
+    -------
+    int
+        Exit status of the query, or None if the server does not answer
+        queries for its Remfiles
+
+    Raises
+    ------
+    OSError
+        If the server cannot be reached
+    RuntimeError
+        If the reply is empty or malformed
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(argv).encode("utf-8") + b"\n")
+        connection.shutdown(socket.SHUT_WR)
+        with connection.makefile("rb") as reply_file:
+            text = reply_file.read()
+    try:
+        reply = json.loads(text.decode("utf-8"))
+        reply["status"], reply["stdout"], reply["stderr"]
+    except (ValueError, TypeError, KeyError):
+        raise RuntimeError("invalid reply %r" % text[:80])
+    if reply.get("refused"):
+        return None
+    sys.stdout.write(reply["stdout"])
+    sys.stderr.write(reply["stderr"])
+    return reply["status"]
 
 
 def slot_list(agenda_start_hour, agenda_end_hour):
@@ -845,46 +5811,157 @@ def mark_interval(
 
     for i in range(start_interval, end_interval + 1):
         if not free_busy[i] == CONFLICT:
-            if state[i] == [1, 1, 1]:
-                free_busy[i] = I15
-            elif state[i] == [1, 1, 3]:
-                free_busy[i] = E15
-            elif state[i] == [2, 1, 1]:
-                free_busy[i] = B15
-            elif state[i] == [0, 2, 1]:
-                free_busy[i] = B10
-            elif state[i] == [1, 3, 0]:
-                free_busy[i] = E10
-            elif state[i] == [0, 0, 2]:
-                free_busy[i] = B5
-            elif state[i] == [3, 0, 0]:
-                free_busy[i] = E5
-            elif state[i] == [3, 2, 1]:
-                free_busy[i] = E5B10
-            elif state[i] == [4, 2, 1]:
-                free_busy[i] = E5B10
-            elif state[i] == [1, 3, 2]:
-                free_busy[i] = E10B5
-            elif state[i] == [1, 3, 4]:
-                free_busy[i] = E10B5
-            elif state[i] == [3, 0, 2]:
-                free_busy[i] = E5B5
-            elif state[i] == [4, 0, 0]:
-                free_busy[i] = BE
-            elif state[i] == [0, 4, 0]:
-                free_busy[i] = BE
-            elif state[i] == [0, 0, 4]:
-                free_busy[i] = BE
-            elif state[i] == [0, 4, 2]:
-                free_busy[i] = E5B5
-            elif state[i] == [3, 4, 0]:
-                free_busy[i] = E5B5
-            elif state[i] == [2, 3, 0]:
-                free_busy[i] = BE
-            elif state[i] == [0, 2, 3]:
-                free_busy[i] = BE
-            elif state[i] == [2, 1, 3]:
-                free_busy[i] = "#"
+            marker = STATE_MARKERS.get(tuple(state[i]))
+            if marker is not None:
+                free_busy[i] = marker
+
+
+def free_busy_rows(day_events, agenda_start_hour, agenda_end_hour):
+    """
+    Build the free/busy display for many days at once with NumPy.
+
+    The state codes of mark_interval are kept in a days x slots x 5 minute
+    interval matrix. The n-th timed event of every day is applied in a single
+    batch of array operations, so the loop runs once per event of the busiest
+    day rather than once per event, and the markers come from STATE_MARKERS
+    through a lookup table. The result is identical to calling mark_interval
+    for each event in order.
+
+    Parameters
+    ----------
+    day_events : array
+        Array of the events of each day
+    agenda_start_hour : int
+        Time the agenda starts
+    agenda_end_hour : int
+        Time the agenda end
+
+    Returns
+    -------
+    array
+        Free/busy string for each day
+    """
+    # Imported here so a --client run does not pay for loading NumPy
+    import numpy
+
+    blank = "".join(slot_list(agenda_start_hour, agenda_end_hour))
+    num_days = len(day_events)
+    num_slots = len(blank)
+
+    # Start and duration of the timed events, one column per event
+    day_index, column_index, starts, durations = [], [], [], []
+    rounds = 0
+    for day, events in enumerate(day_events):
+        column = 0
+        for event in events:
+            if event.start is not None:
+                day_index.append(day)
+                column_index.append(column)
+                starts.append(event.start)
+                durations.append(event.duration_minutes)
+                column += 1
+        rounds = max(rounds, column)
+    valid = numpy.zeros((num_days, rounds), dtype=bool)
+    valid[day_index, column_index] = True
+    start_minutes = numpy.zeros((num_days, rounds), dtype=numpy.int64)
+    start_minutes[day_index, column_index] = starts
+    duration = numpy.zeros((num_days, rounds), dtype=numpy.int64)
+    duration[day_index, column_index] = durations
+
+    # Same slot arithmetic as mark_interval, for every event at once
+    agenda_start = 60 * agenda_start_hour
+    start_minutes = numpy.maximum(start_minutes, agenda_start)
+    start_offset = start_minutes - agenda_start
+    start_interval = start_offset // 15
+    start_interval_count = (start_offset % 15) // 5
+    end_offset = numpy.minimum(start_minutes + duration, 60 * agenda_end_hour)
+    end_offset -= agenda_start
+    end_interval = end_offset // 15
+    end_interval_count = (end_offset % 15) // 5
+
+    # One spare slot absorbs the writes mark_interval makes to slot -1
+    state = numpy.zeros((num_days, num_slots + 1, 3), dtype=numpy.int8)
+    free_busy = numpy.tile(
+        numpy.frombuffer(blank.encode("ascii"), dtype=numpy.uint8),
+        (num_days, 1),
+    )
+    conflict = ord(CONFLICT)
+    lookup = numpy.zeros(125, dtype=numpy.uint8)
+    for codes, marker in STATE_MARKERS.items():
+        lookup[codes[0] * 25 + codes[1] * 5 + codes[2]] = ord(marker)
+
+    slots = numpy.arange(num_slots + 1)[None, :]
+    intervals = numpy.arange(3)[None, :]
+
+    for column in range(rounds):
+        days = numpy.nonzero(valid[:, column])[0]
+        s_i = start_interval[days, column]
+        s_c = start_interval_count[days, column]
+        e_i = end_interval[days, column]
+        e_c = end_interval_count[days, column]
+        day_state = state[days]
+        day_free_busy = free_busy[days]
+
+        # Start and end in the same slot
+        same = numpy.nonzero(s_i == e_i)[0]
+        point = same[s_c[same] == e_c[same]]
+        span = same[s_c[same] != e_c[same]]
+        day_state[point, s_i[point], s_c[point]] = 4
+        day_state[span, s_i[span], s_c[span]] = 2
+        day_state[span, s_i[span], e_c[span]] = 3
+        full = span[(s_c[span] == 0) & (e_c[span] == 2)]
+        day_state[full, s_i[full], 1] = 1
+        day_free_busy[same, s_i[same]] = ord(BE)
+
+        # First slot of an event that runs into later slots
+        first = numpy.nonzero(s_i < e_i)[0]
+        first_slot = s_i[first]
+        first_count = s_c[first][:, None]
+        first_state = day_state[first, first_slot]
+        used = (first_state != 0) & (intervals >= first_count)
+        clashes = first[used[:, 0] | used[:, 1] | used[:, 2]]
+        day_free_busy[clashes, s_i[clashes]] = conflict
+        day_state[first, first_slot] = numpy.where(
+            intervals == first_count,
+            2,
+            numpy.where(intervals > first_count, 1, first_state),
+        )
+
+        # Slots between the first slot and the end slot
+        middle = (slots > s_i[:, None]) & (slots < e_i[:, None])
+        busy = [day_state[:, :, interval] for interval in range(3)]
+        taken = [layer != 0 for layer in busy]
+        day_free_busy[
+            (middle & (taken[0] | taken[1] | taken[2]))[:, :num_slots]
+        ] = conflict
+        for layer, layer_taken in zip(busy, taken):
+            layer[middle & ~layer_taken] = 1
+
+        # Mark the end of the event
+        moved = s_i != e_i
+        ends = numpy.nonzero(moved & (e_c == 0))[0]
+        day_state[ends, e_i[ends] - 1, 2] = 3
+        ends = numpy.nonzero(moved & (e_c == 1))[0]
+        day_state[ends, e_i[ends], 0] = 3
+        ends = numpy.nonzero(moved & (e_c == 2))[0]
+        day_state[ends, e_i[ends], 0] = 1
+        day_state[ends, e_i[ends], 1] = 3
+
+        # Pick the markers for the slots the event covers
+        covered = (slots[:, :num_slots] >= s_i[:, None]) & (
+            slots[:, :num_slots] <= e_i[:, None]
+        )
+        codes = day_state[:, :num_slots, :].astype(numpy.int16)
+        markers = lookup[
+            codes[:, :, 0] * 25 + codes[:, :, 1] * 5 + codes[:, :, 2]
+        ]
+        update = covered & (day_free_busy != conflict) & (markers != 0)
+        day_free_busy[update] = markers[update]
+
+        state[days] = day_state
+        free_busy[days] = day_free_busy
+
+    return [row.tobytes().decode("ascii") for row in free_busy]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+"""
+test_load_range.py
+
+Regression tests for loading a range of days over months that are already
+loaded: no month may be parsed a second time, neither in one RemData nor in
+a long-lived --serve process answering overlapping queries.
+"""
+
+# Imports
+import datetime
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import rem_agenda  # noqa: E402
+
+# Constants
+REM_AGENDA = os.path.join(
+    os.path.dirname(__file__), os.pardir, "rem_agenda.py"
+)
+FAKE_REMIND = os.path.join(
+    os.path.dirname(__file__), os.pardir, "benchmarks", "fake_remind.py"
+)
+CALENDAR = "events=5000\ndays=365\nstart=2027-01-01\noverlap=0.25\n"
+QUERIES = [
+    ["-b", "2027-02-03", "-d", "1"],
+    ["-b", "2027-01-31", "-d", "35"],
+    ["-b", "2027-04-10", "-d", "3", "-v", "d"],
+    ["-b", "2027-02-20", "-d", "70", "--conflicts"],
+    ["-b", "2027-03-01", "-d", "14", "--stats"],
+    ["-b", "2026-12-25", "-d", "14", "--format", "json"],
+    ["-b", "2027-01-05", "-d", "7", "-s", "review"],
+]
+STARTUP_SECONDS = 30
+
+
+class LoadRangeTest(unittest.TestCase):
+    """
+    Loads ranges that overlap months loaded before
+    """
+
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.workdir = workdir.name
+        self.remfile = os.path.join(self.workdir, "synthetic.rem")
+        with open(self.remfile, "w") as output:
+            output.write(CALENDAR)
+
+    def count_events(self, rem_data, year, month):
+        return sum(
+            len(events) for events in rem_data.data[year][month].values()
+        )
+
+    def test_loaded_month_inside_range(self):
+        for jobs in (1, 3):
+            rem_data = rem_agenda.RemData(FAKE_REMIND, self.remfile, jobs=jobs)
+            rem_data.load_months([(2027, 2)])
+            before = self.count_events(rem_data, 2027, 2)
+            rem_data.load_range(datetime.datetime(2027, 1, 1), 90)
+            self.assertEqual(self.count_events(rem_data, 2027, 2), before)
+
+    def test_repeated_server_queries(self):
+        common = [
+            "--remind",
+            FAKE_REMIND,
+            "-r",
+            self.remfile,
+            "--no_cache",
+            "--jobs",
+            "1",
+        ]
+        socket_path = os.path.join(self.workdir, "server.sock")
+        server = subprocess.Popen(
+            [sys.executable, REM_AGENDA, "--serve", socket_path] + common
+        )
+        try:
+            deadline = time.monotonic() + STARTUP_SECONDS
+            while not os.path.exists(socket_path):
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.05)
+            for query in QUERIES + QUERIES:
+                with self.subTest(query=" ".join(query)):
+                    self.assertEqual(
+                        run(["--client", socket_path] + query),
+                        run(common + query),
+                    )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def run(argv):
+    """
+    Run rem_agenda.py and capture its output
+
+    Parameters
+    ----------
+    argv : array
+        Command line arguments
+
+    Returns
+    -------
+    string
+        What the run wrote to stdout
+    """
+    return subprocess.run(
+        [sys.executable, REM_AGENDA] + argv,
+        capture_output=True,
+        universal_newlines=True,
+    ).stdout
+
+
+if __name__ == "__main__":
+    unittest.main()